@@ -2,97 +2,275 @@
 
 from __future__ import annotations
 
+import asyncio
+import inspect
+import json
 import logging
 
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
+from typing import Any
 from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
 from UMLBot.config.config import UMLBotConfig
 from UMLBot.services import (
     DiagramGenerationResult,
+    close_http_client,
+    create_placeholder_image,
     diagram_image_to_base64,
     generate_diagram_from_description,
-    render_diagram_from_code,
+    get_http_client,
+    render_png_from_code,
+    stream_diagram_from_description,
 )
+from UMLBot.utils.cache import TTLCache, hash_key
+
+try:  # Faster encoding of the large base64 payloads when the ``perf`` extra is installed.
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+LOGGER = logging.getLogger(__name__)
+
+GenerateFn = Callable[
+    [str, str, str | None],
+    Awaitable[DiagramGenerationResult] | DiagramGenerationResult,
+]
+StreamFn = Callable[[str, str, str | None], AsyncIterator[str | DiagramGenerationResult]]
+
+
+class _FastJSONResponse(JSONResponse):
+    """JSONResponse that serializes with orjson when it is available."""
+
+    def render(self, content: Any) -> bytes:
+        """Encode ``content`` as compact UTF-8 JSON."""
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+class GenerateRequest(BaseModel):
+    """Body of ``/api/generate`` and ``/api/generate/stream``."""
+
+    description: str = Field(min_length=1)
+    diagram_type: str = Field(min_length=1)
+    theme: str | None = None
+
+
+class GenerateBatchRequest(BaseModel):
+    """Body of ``/api/generate_batch``; items are validated one by one as ``GenerateRequest``."""
+
+    items: list[Any] = Field(min_length=1, max_length=UMLBotConfig.BATCH_MAX_ITEMS)
+
+
+class RenderRequest(BaseModel):
+    """Body of ``/api/render``; ``code`` is used when ``plantuml_code`` is missing or empty."""
+
+    plantuml_code: str = Field(min_length=1)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _fall_back_to_code(cls, data: Any) -> Any:
+        """Map the legacy ``code`` field onto ``plantuml_code``, as the endpoint always has."""
+        if isinstance(data, dict) and not data.get("plantuml_code") and "code" in data:
+            data = {**data, "plantuml_code": data["code"]}
+        return data
+
+
+def _validation_error_body(errors: Sequence[Any]) -> dict[str, str]:
+    """Summarize pydantic validation errors as the API's error payload."""
+    fields = sorted({str(error["loc"][-1]) for error in errors if error.get("loc")})
+    return {"status": "error", "message": f"Missing or invalid fields: {', '.join(fields)}"}
+
+
+def _sse_event(data: dict[str, Any]) -> bytes:
+    """Encode ``data`` as one Server-Sent Events ``data:`` frame."""
+    body = orjson.dumps(data) if orjson is not None else json.dumps(data).encode("utf-8")
+    return b"data: " + body + b"\n\n"
+
+
+@asynccontextmanager
+async def _lifespan(api_app: FastAPI) -> AsyncIterator[None]:
+    """Open the shared PlantUML HTTP client on startup and close it on shutdown."""
+    get_http_client()
+    try:
+        yield
+    finally:
+        await close_http_client()
 
 
 def create_api_app(
-    generate_fn: Callable[[str, str, str | None], "DiagramGenerationResult"] | None = None,
+    generate_fn: GenerateFn | None = None,
+    stream_fn: StreamFn | None = None,
 ) -> FastAPI:
-    """Builds the FastAPI application exposing JSON endpoints for diagram generation."""
+    """
+    Builds the FastAPI application exposing JSON endpoints for diagram generation.
+
+    ``generate_fn`` may be a coroutine function (the default) or a plain callable;
+    awaitable results are awaited so the event loop is never blocked on I/O.
+
+    Successful ``/api/generate`` responses are cached per app instance, keyed on the
+    normalized (description, diagram_type, theme) triple, so repeats skip the LLM and render.
+    ``/api/generate_batch`` fans several such requests out concurrently; the service layer's
+    LLM semaphore still bounds how many reach the provider at once.
+
+    ``/api/generate/stream`` emits the same result over Server-Sent Events, preceded by
+    ``token`` events carrying PlantUML text as ``stream_fn`` produces it.
+    """
     if generate_fn is None:
         generate_fn = generate_diagram_from_description
+    if stream_fn is None:
+        stream_fn = stream_diagram_from_description
+    response_cache = TTLCache(
+        maxsize=UMLBotConfig.RESPONSE_CACHE_MAXSIZE,
+        ttl=UMLBotConfig.RESPONSE_CACHE_TTL_SECONDS,
+    )
 
-    api_app = FastAPI(title="UMLBot HTTP API")
+    api_app = FastAPI(
+        title="UMLBot HTTP API",
+        lifespan=_lifespan,
+        default_response_class=_FastJSONResponse,
+    )
     api_app.add_middleware(
         CORSMiddleware,
         allow_origins=UMLBotConfig.CORS_ALLOW_ORIGINS,
         allow_methods=["POST", "OPTIONS"],
         allow_headers=["Content-Type", "Authorization", "Accept"],
+        allow_credentials=False,
+        max_age=UMLBotConfig.CORS_MAX_AGE_SECONDS,
     )
+    # Base64 image payloads compress well; small error bodies are left alone.
+    api_app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+    @api_app.exception_handler(RequestValidationError)
+    async def validation_error_handler(request: Request, exc: RequestValidationError):
+        """Report malformed request bodies in the API's ``{"status": "error"}`` shape."""
+        return _FastJSONResponse(status_code=400, content=_validation_error_body(exc.errors()))
+
+    async def _generate_payload(body: GenerateRequest) -> tuple[int, dict[str, Any]]:
+        """Generate (or fetch from cache) one diagram and return its HTTP status and body."""
+        cache_key = hash_key(body.description, body.diagram_type, body.theme)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return 200, cached
+
+        result = generate_fn(body.description, body.diagram_type, body.theme)
+        if inspect.isawaitable(result):
+            result = await result
+        return _result_payload(cache_key, result)
+
+    def _result_payload(
+        cache_key: str, result: DiagramGenerationResult
+    ) -> tuple[int, dict[str, Any]]:
+        """Serialize a generation result, caching successful non-fallback payloads."""
+        if not result.plantuml_code:
+            return 500, {
+                "status": "error",
+                "message": result.status_message or "Generation failed",
+            }
+
+        image_base64 = diagram_image_to_base64(result.png_bytes or result.pil_image)
+        payload = {
+            "status": "ok",
+            "plantuml_code": result.plantuml_code,
+            "image_base64": image_base64,
+            "image_url": result.image_url,
+            "message": result.status_message,
+        }
+        if image_base64 is not None and not result.is_fallback:
+            response_cache.set(cache_key, payload)
+        return 200, payload
+
+    async def _batch_item_payload(item: Any) -> tuple[int, dict[str, Any]]:
+        """Validate and generate one batch item, reporting bad input in its own slot."""
+        try:
+            body = GenerateRequest.model_validate(item)
+        except ValidationError as exc:
+            return 400, _validation_error_body(exc.errors())
+        return await _generate_payload(body)
 
     @api_app.post("/api/generate")
-    async def generate_endpoint(request: Request):
+    async def generate_endpoint(body: GenerateRequest):
         """Handle diagram generation requests from the frontend."""
         try:
-            data = await request.json()
-            description = data.get("description")
-            diagram_type = data.get("diagram_type")
-            theme = data.get("theme")
-
-            if not description or not diagram_type:
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "status": "error",
-                        "message": "Missing required fields: description, diagram_type",
-                    },
-                )
+            status_code, payload = await _generate_payload(body)
+            if status_code != 200:
+                return _FastJSONResponse(status_code=status_code, content=payload)
+            return payload
+        except Exception:
+            LOGGER.exception("Unhandled exception in /api/generate")
+            return _FastJSONResponse(
+                status_code=500,
+                content={"status": "error", "message": "Internal server error"},
+            )
+
+    @api_app.post("/api/generate/stream")
+    async def generate_stream_endpoint(body: GenerateRequest):
+        """Stream diagram generation to the frontend as Server-Sent Events."""
+        cache_key = hash_key(body.description, body.diagram_type, body.theme)
 
-            result = generate_fn(description, diagram_type, theme)
-            if not result.plantuml_code:
-                return JSONResponse(
-                    status_code=500,
-                    content={
-                        "status": "error",
-                        "message": result.status_message or "Generation failed",
-                    },
+        async def events() -> AsyncIterator[bytes]:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                yield _sse_event({"type": "result", **cached})
+                return
+            try:
+                async for item in stream_fn(body.description, body.diagram_type, body.theme):
+                    if isinstance(item, DiagramGenerationResult):
+                        _, payload = _result_payload(cache_key, item)
+                        yield _sse_event({"type": "result", **payload})
+                    else:
+                        yield _sse_event({"type": "token", "content": item})
+            except Exception:
+                LOGGER.exception("Unhandled exception in /api/generate/stream")
+                yield _sse_event(
+                    {"type": "result", "status": "error", "message": "Internal server error"}
                 )
 
-            image_base64 = diagram_image_to_base64(result.pil_image)
-            return {
-                "status": "ok",
-                "plantuml_code": result.plantuml_code,
-                "image_base64": image_base64,
-                "image_url": result.image_url,
-                "message": result.status_message,
-            }
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @api_app.post("/api/generate_batch")
+    async def generate_batch_endpoint(body: GenerateBatchRequest):
+        """
+        Generate several diagrams concurrently from ``{"items": [{...}, ...]}``.
+
+        Each item is validated, cached, and generated independently, so one bad item is
+        reported in its own result slot without failing the rest of the batch.
+        """
+        try:
+            outcomes = await asyncio.gather(
+                *(_batch_item_payload(item) for item in body.items), return_exceptions=True
+            )
+            results = []
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    LOGGER.error("Batch item failed in /api/generate_batch: %s", outcome)
+                    results.append({"status": "error", "message": "Internal server error"})
+                else:
+                    results.append(outcome[1])
+            return {"status": "ok", "results": results}
         except Exception:
-            logging.exception("Unhandled exception in /api/generate")
-            return JSONResponse(
+            LOGGER.exception("Unhandled exception in /api/generate_batch")
+            return _FastJSONResponse(
                 status_code=500,
                 content={"status": "error", "message": "Internal server error"},
             )
 
     @api_app.post("/api/render")
-    async def render_endpoint(request: Request):
+    async def render_endpoint(body: RenderRequest):
         """Render a PlantUML snippet into an image for client previews."""
         try:
-            data = await request.json()
-            plantuml_code = data.get("plantuml_code") or data.get("code")
-            if not plantuml_code:
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "status": "error",
-                        "message": "Missing required field: plantuml_code",
-                    },
-                )
-
-            pil_image, status_msg, image_url = render_diagram_from_code(plantuml_code)
-            image_base64 = diagram_image_to_base64(pil_image)
+            png_bytes, status_msg, image_url = await render_png_from_code(body.plantuml_code)
+            image_base64 = diagram_image_to_base64(png_bytes or create_placeholder_image())
             return {
                 "status": "ok",
                 "image_base64": image_base64,
@@ -100,8 +278,8 @@ def create_api_app(
                 "message": status_msg,
             }
         except Exception:
-            logging.exception("Unhandled exception in /api/render")
-            return JSONResponse(
+            LOGGER.exception("Unhandled exception in /api/render")
+            return _FastJSONResponse(
                 status_code=500,
                 content={"status": "error", "message": "Internal server error"},
             )
@@ -109,4 +287,4 @@ def create_api_app(
     return api_app
 
 
-__all__ = ["create_api_app"]
+__all__ = ["GenerateBatchRequest", "GenerateRequest", "RenderRequest", "create_api_app"]
@@ -1,8 +1,11 @@
 """Application configuration for UMLBot."""
 
+import atexit
 import logging
 import logging.config
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 from aiweb_common.WorkflowHandler import manage_sensitive
@@ -112,6 +115,25 @@ class UMLBotConfig:
             "http://localhost:8080", "http://plantuml:8080"
         ).replace("http://127.0.0.1:8080", "http://plantuml:8080")
 
+    # Widest diagram preview sent to the Gradio UI; larger renders are downscaled (0 disables).
+    PREVIEW_MAX_WIDTH = int(os.getenv("UMLBOT_PREVIEW_MAX_WIDTH", "1600"))
+
+    # Connection pool for the shared PlantUML HTTP client (per worker process).
+    PLANTUML_TIMEOUT_SECONDS = float(os.getenv("UMLBOT_PLANTUML_TIMEOUT_SECONDS", "10"))
+    # Shorter bound on opening a connection so an unreachable render server fails fast.
+    PLANTUML_CONNECT_TIMEOUT_SECONDS = float(
+        os.getenv("UMLBOT_PLANTUML_CONNECT_TIMEOUT_SECONDS", "3")
+    )
+    # DEFLATE level for render URLs. Level 3 (ISA-L's maximum) compresses short PlantUML
+    # sources nearly as well as level 9 at a fraction of the CPU cost.
+    PLANTUML_COMPRESSION_LEVEL = int(os.getenv("UMLBOT_PLANTUML_COMPRESSION_LEVEL", "3"))
+    # Reconnect attempts after a refused or timed-out connection; requests are not resent.
+    PLANTUML_CONNECT_RETRIES = int(os.getenv("UMLBOT_PLANTUML_CONNECT_RETRIES", "2"))
+    PLANTUML_MAX_CONNECTIONS = int(os.getenv("UMLBOT_PLANTUML_MAX_CONNECTIONS", "64"))
+    PLANTUML_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("UMLBOT_PLANTUML_MAX_KEEPALIVE_CONNECTIONS", "32")
+    )
+
     # LLM Configuration
     # For security, prefer to set LLM_API_KEY as an environment variable.
     try:
@@ -120,19 +142,80 @@ class UMLBotConfig:
         LLM_API_KEY = os.getenv("UMLBOT_LLM_API_KEY", "")
     LLM_MODEL = os.getenv("UMLBOT_LLM_MODEL", "gpt-4o-mini")
     LLM_API_BASE = os.getenv("UMLBOT_LLM_API_BASE", "")
+    # Upper bound on simultaneous LLM calls per process; protects against provider 429 storms.
+    LLM_MAX_CONCURRENCY = int(os.getenv("UMLBOT_LLM_MAX_CONCURRENCY", "4"))
+    # Per-call bounds so one runaway completion cannot pin a worker or inflate cost.
+    LLM_MAX_TOKENS = int(os.getenv("UMLBOT_LLM_MAX_TOKENS", "2048"))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("UMLBOT_LLM_TIMEOUT_SECONDS", "60"))
+    # Largest number of diagrams accepted by one /api/generate_batch request.
+    BATCH_MAX_ITEMS = int(os.getenv("UMLBOT_BATCH_MAX_ITEMS", "10"))
+    # Response cache for repeated /api/generate requests (in-process, per worker).
+    RESPONSE_CACHE_MAXSIZE = int(os.getenv("UMLBOT_RESPONSE_CACHE_MAXSIZE", "1024"))
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("UMLBOT_RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    # PlantUML code returned by the LLM, reused for identical generation inputs (per worker).
+    LLM_CACHE_MAXSIZE = int(os.getenv("UMLBOT_LLM_CACHE_MAXSIZE", "512"))
+    # Rendered PNG bytes keyed by PlantUML URL (per worker, expiring after the response TTL).
+    # Each entry is a whole PNG, so the default stays well below the JSON response cache.
+    RENDER_CACHE_MAXSIZE = int(os.getenv("UMLBOT_RENDER_CACHE_MAXSIZE", "256"))
     CORS_ALLOW_ORIGINS = os.getenv("UMLBOT_CORS_ALLOW_ORIGINS", "")
     if CORS_ALLOW_ORIGINS:
         CORS_ALLOW_ORIGINS = [origin.strip() for origin in CORS_ALLOW_ORIGINS.split(",")]
     else:
         CORS_ALLOW_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    # Lets browsers cache CORS preflight responses so repeat POSTs skip the OPTIONS round trip.
+    CORS_MAX_AGE_SECONDS = int(os.getenv("UMLBOT_CORS_MAX_AGE_SECONDS", "86400"))
+    # "production" quiets the console log handler; anything else keeps verbose dev output.
+    ENVIRONMENT = os.getenv("UMLBOT_ENV", "development").strip().lower()
+    IS_PRODUCTION = ENVIRONMENT == "production"
+    # Rich console rendering is for local development; plain stream logging is the default.
+    PRETTY_LOGS = os.getenv("UMLBOT_PRETTY_LOGS", "0") == "1"
+    # Rotating log files cannot be shared between processes; multi-worker serving turns them off
+    # and logs to stdout only.
+    LOG_TO_FILES = os.getenv("UMLBOT_LOG_TO_FILES", "1") == "1"
     # If using Azure, set LLM_API_BASE to your Azure endpoint and adjust model name as needed.
 
     # MLFlow model registry
 
 
+class FastRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler whose rollover check uses only the stream position.
+
+    The stdlib implementation formats every record once to measure it and again to write
+    it; this variant rolls over once the file has reached ``maxBytes`` (as CPython 3.14 does),
+    so each record is formatted a single time.
+    """
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """Return True when the current log file has grown past ``maxBytes``."""
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0:
+            return False
+        if self.stream.tell() < self.maxBytes:
+            return False
+        # Never roll over anything other than regular files (bpo-45401).
+        return not os.path.exists(self.baseFilename) or os.path.isfile(self.baseFilename)
+
+
 # Make sure log directory exists
 UMLBotConfig.LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
+if UMLBotConfig.PRETTY_LOGS:
+    _console_handler = {
+        "class": "rich.logging.RichHandler",
+        "level": logging.DEBUG,
+        "formatter": "minimal",
+        "markup": True,  # Pass argument to RichHandler
+    }
+else:
+    _console_handler = {
+        "class": "logging.StreamHandler",
+        # Production keeps only warnings and errors on the console.
+        "level": logging.WARNING if UMLBotConfig.IS_PRODUCTION else logging.INFO,
+        "formatter": "detailed",
+    }
+
 logging_config = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -142,38 +225,58 @@ logging_config = {
             "format": "%(levelname)s %(asctime)s [%(name)s:%(filename)s:%(funcName)s:%(lineno)d]\n%(message)s\n"
         },
     },
-    "handlers": {
-        "console": {
-            "class": "rich.logging.RichHandler",
-            "level": logging.DEBUG,
-            "formatter": "minimal",
-            "markup": True,  # Pass argument to RichHandler
-        },
-        "info": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": str(UMLBotConfig.LOGS_DIR / "info.log"),
-            "maxBytes": 10485760,
-            "backupCount": 10,
-            "formatter": "detailed",
-            "level": logging.INFO,
-            "mode": "a",
-        },
-        "error": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": str(UMLBotConfig.LOGS_DIR / "error.log"),
-            "maxBytes": 10485760,
-            "backupCount": 10,
-            "formatter": "detailed",
-            "level": logging.ERROR,
-            "mode": "a",
-        },
-    },
+    "handlers": {"console": _console_handler},
     "root": {
-        "handlers": ["console", "info", "error"],
+        "handlers": ["console"],
         "level": logging.INFO,
-        "propagate": False,
     },
 }
 
+if UMLBotConfig.LOG_TO_FILES:
+    logging_config["handlers"].update(
+        {
+            "info": {
+                "()": FastRotatingFileHandler,
+                "filename": str(UMLBotConfig.LOGS_DIR / "info.log"),
+                "maxBytes": 10485760,
+                "backupCount": 10,
+                "formatter": "detailed",
+                "level": logging.INFO,
+                "mode": "a",
+            },
+            "error": {
+                "()": FastRotatingFileHandler,
+                "filename": str(UMLBotConfig.LOGS_DIR / "error.log"),
+                "maxBytes": 10485760,
+                "backupCount": 10,
+                "formatter": "detailed",
+                "level": logging.ERROR,
+                "mode": "a",
+            },
+        }
+    )
+    logging_config["root"]["handlers"] += ["info", "error"]
+
+
+def _install_queue_logging() -> QueueListener:
+    """
+    Move the root handlers behind a QueueHandler so callers only enqueue records.
+
+    A QueueListener thread performs the console rendering and file writes, keeping disk
+    I/O and handler locks off the request-serving event loop.
+    """
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
 logging.config.dictConfig(logging_config)
+_log_listener = _install_queue_logging()
 logger = logging.getLogger(__name__)
@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Callable, Protocol
+import inspect
+from typing import Any, AsyncIterator, Callable, Protocol
 
 from UMLBot.exceptions import LLMError
 
@@ -29,26 +30,71 @@ class LangchainLLMAdapter:
     """Adapter that normalizes a callable into an LLM interface."""
 
     def __init__(self, config: dict[str, Any]) -> None:
-        """Initialize the adapter with a callable under ``llm_callable``."""
-        llm_callable = config.get("llm_callable")
+        """
+        Initialize the adapter with a callable under ``llm_callable``.
+
+        A coroutine function (passed as ``llm_callable`` or ``async_llm_callable``) is
+        awaited directly by ``invoke_async`` instead of being run in a worker thread.
+        """
+        async_llm_callable = config.get("async_llm_callable")
+        if async_llm_callable is not None and not callable(async_llm_callable):
+            raise ValueError("config['async_llm_callable'] must be a callable.")
+        llm_callable = config.get("llm_callable") or async_llm_callable
         if llm_callable is None or not callable(llm_callable):
             raise ValueError("config['llm_callable'] must be a callable.")
+        if async_llm_callable is None and inspect.iscoroutinefunction(llm_callable):
+            async_llm_callable = llm_callable
         self._llm_callable: LLMCallable = llm_callable
+        self._async_llm_callable = async_llm_callable
 
     def invoke(self, prompt: str) -> str:
-        """Invoke the underlying callable and normalize errors."""
+        """
+        Invoke the underlying callable and normalize errors.
+
+        Async-only callables are rejected rather than run on a fresh event loop, which would
+        break clients pooled on another loop and fail inside a running one; use
+        ``invoke_async`` for them.
+        """
+        if self._llm_callable is self._async_llm_callable:
+            raise TypeError("The LLM callable is async-only; use invoke_async() instead.")
         try:
-            return self._llm_callable(prompt)
+            result = self._llm_callable(prompt)
         except Exception as exc:  # pragma: no cover - exception path exercised in tests
             raise LLMError(str(exc)) from exc
+        if inspect.isawaitable(result):
+            if inspect.iscoroutine(result):
+                result.close()
+            raise TypeError("The LLM callable returned an awaitable; use invoke_async() instead.")
+        return result
 
     async def invoke_async(self, prompt: str) -> str:
-        """Invoke the callable asynchronously using a thread helper."""
+        """
+        Invoke the LLM without blocking the event loop.
+        Native coroutine callables are awaited directly; sync callables run in a thread.
+        """
         try:
+            if self._async_llm_callable is not None:
+                return await self._async_llm_callable(prompt)
             return await asyncio.to_thread(self._llm_callable, prompt)
         except Exception as exc:
             raise LLMError(str(exc)) from exc
 
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield response chunks from the callable's ``astream`` interface.
+        Callables without one yield their full ``invoke_async`` response as a single chunk.
+        Named like LangChain's method so ``UMLDraftHandler.process_stream_async`` picks it up.
+        """
+        astream = getattr(self._llm_callable, "astream", None)
+        if astream is None:
+            yield await self.invoke_async(prompt)
+            return
+        try:
+            async for chunk in astream(prompt):
+                yield getattr(chunk, "content", chunk)
+        except Exception as exc:
+            raise LLMError(str(exc)) from exc
+
 
 __all__ = ["LangchainLLMAdapter", "LLMInterface"]
 
@@ -0,0 +1,43 @@
+"""Production entrypoint that serves the UMLBot HTTP API across several Uvicorn workers.
+
+Run with ``python -m UMLBot.serve``. Each worker is a separate process with its own event
+loop, HTTP client pool, LLM semaphore, and response cache, so a blocking or CPU-heavy
+request only stalls the worker handling it. Because ``UMLBOT_LLM_MAX_CONCURRENCY`` and the
+caches apply per worker, the LLM provider can see up to that limit times the worker count
+in simultaneous calls. Workers log to stdout only, since several processes cannot share the
+rotating log files. The Gradio UI (``gradio_app:app``) keeps per-process session state and
+should stay on a single worker.
+"""
+
+import os
+
+import uvicorn
+
+
+def default_workers() -> int:
+    """Return the worker count from ``WEB_CONCURRENCY``, defaulting to ``2 * CPUs + 1``."""
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return (os.cpu_count() or 1) * 2 + 1
+
+
+def main() -> None:
+    """Start Uvicorn with the API app factory and the configured worker count."""
+    # Read by UMLBot.config when each worker imports it; this process never imports it.
+    os.environ.setdefault("UMLBOT_LOG_TO_FILES", "0")
+    uvicorn.run(
+        "UMLBot.api_server:create_api_app",
+        factory=True,
+        host=os.getenv("UMLBOT_HOST", "0.0.0.0"),
+        port=int(os.getenv("UMLBOT_PORT", "7860")),
+        workers=default_workers(),
+        # "auto" picks uvloop and httptools when installed (perf extra) and falls back
+        # to asyncio and h11 otherwise.
+        loop="auto",
+        http="auto",
+    )
+
+
+if __name__ == "__main__":
+    main()
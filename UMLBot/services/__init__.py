@@ -2,14 +2,28 @@
 
 from .diagram_service import (
     DiagramGenerationResult,
+    close_http_client,
+    create_placeholder_image,
     generate_diagram_from_description,
+    get_http_client,
+    get_shared_handler,
     render_diagram_from_code,
+    render_png_from_code,
+    reset_handler,
     diagram_image_to_base64,
+    stream_diagram_from_description,
 )
 
 __all__ = [
     "DiagramGenerationResult",
+    "close_http_client",
+    "create_placeholder_image",
     "diagram_image_to_base64",
     "generate_diagram_from_description",
+    "get_http_client",
+    "get_shared_handler",
     "render_diagram_from_code",
+    "render_png_from_code",
+    "reset_handler",
+    "stream_diagram_from_description",
 ]
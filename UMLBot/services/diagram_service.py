@@ -2,22 +2,73 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import contextlib
+import functools
 import io
 import logging
 import re
+import threading
 import zlib
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional, Tuple
 
-import requests
-from PIL import Image, ImageDraw, ImageFont
+import httpx
+from PIL import Image
 
 from UMLBot.config.config import UMLBotConfig
 from UMLBot.uml_draft_handler import UMLDraftHandler
+from UMLBot.utils.cache import TTLCache, hash_key
+from UMLBot.utils.plantuml_extractor import extract_last_plantuml_block
+
+if TYPE_CHECKING:
+    from PIL import ImageFont
+
+try:  # SIMD base64 when the optional ``perf`` extra is installed.
+    import pybase64 as _b64
+except ImportError:  # pragma: no cover - exercised only without pybase64
+    _b64 = base64
+
+try:  # ISA-L accelerated DEFLATE; produces the same raw-deflate stream as zlib.
+    from isal import isal_zlib as _zlib
+except ImportError:  # pragma: no cover - exercised only without isal
+    _zlib = zlib
+
+# ISA-L accepts levels 0-3, so higher configured levels are capped when it is in use.
+_PLANTUML_COMPRESSION_LEVEL = (
+    min(UMLBotConfig.PLANTUML_COMPRESSION_LEVEL, 3)
+    if _zlib is not zlib
+    else UMLBotConfig.PLANTUML_COMPRESSION_LEVEL
+)
 
 LOGGER = logging.getLogger(__name__)
 
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+_HANDLER: UMLDraftHandler | None = None
+_HANDLER_LOCK = threading.Lock()
+_LLM_SEM = asyncio.Semaphore(UMLBotConfig.LLM_MAX_CONCURRENCY)
+_LLM_CODE_CACHE = TTLCache(
+    maxsize=UMLBotConfig.LLM_CACHE_MAXSIZE,
+    ttl=UMLBotConfig.RESPONSE_CACHE_TTL_SECONDS,
+)
+# Render URLs embed the encoded diagram source, so a URL fully identifies its PNG. Entries
+# expire like the response cache so whole PNGs are not held for the life of the worker.
+_PNG_CACHE = TTLCache(
+    maxsize=UMLBotConfig.RENDER_CACHE_MAXSIZE,
+    ttl=UMLBotConfig.RESPONSE_CACHE_TTL_SECONDS,
+)
+_CODE_BLOCK_RE = re.compile(r"^```(?:plantuml)?\s*|```$", re.MULTILINE)
+_BRACE_RUN_RE = re.compile(r"([{}])\1+")
+_END_MARKER = "@enduml"
+_STREAM_DONE = object()
+# Maps the standard base64 alphabet onto PlantUML's URL alphabet.
+# A 256-byte table, so the translation runs over the raw base64 bytes before decoding.
+_PLANTUML_B64_TRANSLATION = bytes.maketrans(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+    b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_",
+)
+
 
 @dataclass
 class DiagramGenerationResult:
@@ -26,9 +77,110 @@ class DiagramGenerationResult:
     pil_image: Image.Image | None
     status_message: str
     image_url: str
+    is_fallback: bool = False
+    png_bytes: bytes | None = None
+
+    def load_image(self) -> Image.Image | None:
+        """
+        Return the diagram as a PIL image, decoding ``png_bytes`` on first use.
+
+        Generation keeps only the server's PNG bytes so API responses can ship them
+        unmodified; UI callers that need a PIL image pay for the decode here.
+        """
+        if self.pil_image is None and self.png_bytes:
+            self.pil_image = _decode_png(self.png_bytes)
+        return self.pil_image
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared async HTTP client used for PlantUML renders, creating it on demand.
+
+    The client keeps a keep-alive connection pool to the render server, so only the first
+    request per connection pays TCP setup and DNS resolution. Connecting is bounded separately
+    from reading so an unreachable server fails fast while slow renders still complete, and
+    failed connection attempts (not responses) are retried by the transport.
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                UMLBotConfig.PLANTUML_TIMEOUT_SECONDS,
+                connect=UMLBotConfig.PLANTUML_CONNECT_TIMEOUT_SECONDS,
+            ),
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=UMLBotConfig.PLANTUML_MAX_CONNECTIONS,
+                    max_keepalive_connections=UMLBotConfig.PLANTUML_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                retries=UMLBotConfig.PLANTUML_CONNECT_RETRIES,
+            ),
+        )
+    return _HTTP_CLIENT
+
+
+async def close_http_client() -> None:
+    """Close the shared async HTTP client, if one was created."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
+
+def _get_handler(api_key: str) -> UMLDraftHandler:
+    """
+    Return the process-wide UMLDraftHandler, creating and connecting it on first use.
+
+    Sharing one handler keeps its LLM client (and that client's connection pool) and its
+    parsed prompt template alive across requests.
+    """
+    global _HANDLER
+    handler = _HANDLER
+    if handler is None:
+        with _HANDLER_LOCK:
+            handler = _HANDLER
+            if handler is None:
+                handler = UMLDraftHandler()
+                handler._init_openai(
+                    openai_compatible_endpoint=UMLBotConfig.LLM_API_BASE,
+                    openai_compatible_key=api_key,
+                    openai_compatible_model=UMLBotConfig.LLM_MODEL,
+                    name="UMLBot",
+                )
+                handler.llm_interface = _bound_llm(handler.llm_interface)
+                _HANDLER = handler
+    return handler
+
+
+def get_shared_handler() -> UMLDraftHandler:
+    """Return the process-wide UMLDraftHandler connected with the configured API key."""
+    return _get_handler(UMLBotConfig.LLM_API_KEY)
+
+
+def _bound_llm(llm_interface: Any) -> Any:
+    """
+    Apply the configured token and timeout bounds to every call made through the LLM.
+
+    LangChain chat models expose ``bind``, which forwards the bounds with each request;
+    other interfaces are returned unchanged.
+    """
+    bind = getattr(llm_interface, "bind", None)
+    if bind is None:
+        return llm_interface
+    return bind(
+        max_tokens=UMLBotConfig.LLM_MAX_TOKENS,
+        timeout=UMLBotConfig.LLM_TIMEOUT_SECONDS,
+    )
+
 
+def reset_handler() -> None:
+    """Drop the shared UMLDraftHandler so the next request builds a fresh one."""
+    global _HANDLER
+    with _HANDLER_LOCK:
+        _HANDLER = None
 
-def generate_diagram_from_description(
+
+async def generate_diagram_from_description(
     description: str,
     diagram_type: str,
     theme: Optional[str] = None,
@@ -36,6 +188,12 @@ def generate_diagram_from_description(
     """
     Runs the UMLDraftHandler pipeline and returns the PlantUML code plus the rendered image.
     Errors are converted to a fallback PlantUML stub with contextual messaging.
+
+    The blocking LLM call runs in a worker thread and the render is awaited, so concurrent
+    requests overlap their I/O instead of serializing on the event loop. At most
+    ``UMLBotConfig.LLM_MAX_CONCURRENCY`` LLM calls are in flight per process, and the
+    cleaned PlantUML code is cached per (description, diagram_type, theme) so identical
+    requests skip the LLM.
     """
     try:
         api_key = UMLBotConfig.LLM_API_KEY
@@ -49,95 +207,246 @@ def generate_diagram_from_description(
             image_url="",
         )
 
-    handler = UMLDraftHandler()
-    handler._init_openai(
-        openai_compatible_endpoint=UMLBotConfig.LLM_API_BASE,
-        openai_compatible_key=api_key,
-        openai_compatible_model=UMLBotConfig.LLM_MODEL,
-        name="UMLBot",
-    )
+    cache_key = hash_key(description, diagram_type, theme)
+    cached_code = _LLM_CODE_CACHE.get(cache_key)
+    if cached_code is not None:
+        return await _render_generated_code(cached_code, UMLBotConfig.DIAGRAM_SUCCESS_MSG)
+
+    handler = _get_handler(api_key)
 
     try:
-        plantuml_code = handler.process(
+        async with _LLM_SEM:
+            plantuml_code = await asyncio.to_thread(
+                handler.process,
+                diagram_type=diagram_type,
+                description=description,
+                theme=theme,
+                llm_interface=handler.llm_interface,
+            )
+    except Exception as exc:
+        LOGGER.exception("LLM-backed generation failed, returning fallback diagram.")
+        plantuml_code = UMLBotConfig.FALLBACK_PLANTUML_TEMPLATE.format(
             diagram_type=diagram_type,
             description=description,
-            theme=theme,
-            llm_interface=handler.llm_interface,
         )
-        status_msg = UMLBotConfig.DIAGRAM_SUCCESS_MSG
+        status_msg = f"LLM error: {exc}. Showing fallback stub."
+        return await _render_generated_code(
+            _clean_plantuml_code(plantuml_code), status_msg, is_fallback=True
+        )
+
+    normalized_code = _clean_plantuml_code(plantuml_code)
+    _LLM_CODE_CACHE.set(cache_key, normalized_code)
+    return await _render_generated_code(normalized_code, UMLBotConfig.DIAGRAM_SUCCESS_MSG)
+
+
+async def stream_diagram_from_description(
+    description: str,
+    diagram_type: str,
+    theme: Optional[str] = None,
+) -> AsyncIterator[str | DiagramGenerationResult]:
+    """
+    Streaming variant of ``generate_diagram_from_description``.
+
+    Yields PlantUML text chunks as the LLM produces them, then exactly one
+    ``DiagramGenerationResult`` for the cleaned and rendered diagram. LLM errors end the
+    stream with the usual fallback result; cached inputs yield their code as one chunk.
+    The LLM stream is closed as soon as ``@enduml`` arrives, so trailing commentary is
+    neither awaited nor included in the diagram. This keeps the *first* complete block:
+    unlike the non-streaming path, a later revised block in the same response is never
+    seen. Prose before ``@startuml`` is dropped from the cached and rendered code.
+    """
+    try:
+        api_key = UMLBotConfig.LLM_API_KEY
+    except KeyError:
+        api_key = ""
+    if not api_key or not UMLBotConfig.LLM_API_BASE:
+        yield DiagramGenerationResult(
+            plantuml_code="",
+            pil_image=None,
+            status_message=UMLBotConfig.API_KEY_MISSING_MSG,
+            image_url="",
+        )
+        return
+
+    cache_key = hash_key(description, diagram_type, theme)
+    cached_code = _LLM_CODE_CACHE.get(cache_key)
+    if cached_code is not None:
+        yield cached_code
+        yield await _render_generated_code(cached_code, UMLBotConfig.DIAGRAM_SUCCESS_MSG)
+        return
+
+    handler = _get_handler(api_key)
+
+    stream = handler.process_stream_async(
+        diagram_type=diagram_type,
+        description=description,
+        theme=theme,
+        llm_interface=handler.llm_interface,
+    )
+    # A producer task drains the LLM at its own pace, so the concurrency slot is released
+    # when generation ends rather than when a slow client finishes reading the stream.
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+    producer = asyncio.create_task(_pump_llm_stream(stream, queue))
+    chunks: list[str] = []
+    try:
+        while (item := await queue.get()) is not _STREAM_DONE:
+            if isinstance(item, Exception):
+                raise item
+            chunks.append(item)
+            yield item
     except Exception as exc:
-        LOGGER.exception("LLM-backed generation failed, returning fallback diagram.")
+        LOGGER.exception("LLM-backed streaming failed, returning fallback diagram.")
         plantuml_code = UMLBotConfig.FALLBACK_PLANTUML_TEMPLATE.format(
             diagram_type=diagram_type,
             description=description,
         )
         status_msg = f"LLM error: {exc}. Showing fallback stub."
+        yield await _render_generated_code(
+            _clean_plantuml_code(plantuml_code), status_msg, is_fallback=True
+        )
+        return
+    finally:
+        # Stops the LLM stream if the client disconnected mid-generation.
+        producer.cancel()
 
-    cleaned_code = _strip_code_block_markers(plantuml_code)
-    normalized_code = _normalize_curly_braces(cleaned_code)
+    streamed_text = "".join(chunks)
+    try:
+        streamed_text = extract_last_plantuml_block(streamed_text)
+    except ValueError:
+        # Unterminated or marker-less output is rendered as-is, like the non-streaming path.
+        pass
+    normalized_code = _clean_plantuml_code(streamed_text)
+    _LLM_CODE_CACHE.set(cache_key, normalized_code)
+    yield await _render_generated_code(normalized_code, UMLBotConfig.DIAGRAM_SUCCESS_MSG)
+
+
+async def _pump_llm_stream(stream: AsyncIterator[str], queue: asyncio.Queue[Any]) -> None:
+    """
+    Move LLM chunks into ``queue`` while holding an LLM concurrency slot.
+
+    The stream is closed as soon as ``@enduml`` arrives. The queue always ends with either
+    ``_STREAM_DONE`` or the exception that stopped the stream.
+    """
+    try:
+        async with _LLM_SEM:
+            async with contextlib.aclosing(stream):
+                # Only the tail of the previous chunk is kept to catch a marker split
+                # across chunk boundaries.
+                tail = ""
+                async for chunk in stream:
+                    window = tail + chunk
+                    end = window.find(_END_MARKER)
+                    if end != -1:
+                        # The diagram is complete; drop trailing commentary and stop the
+                        # LLM stream instead of waiting for it.
+                        queue.put_nowait(chunk[: end + len(_END_MARKER) - len(tail)])
+                        break
+                    queue.put_nowait(chunk)
+                    tail = window[-(len(_END_MARKER) - 1) :]
+    except Exception as exc:
+        queue.put_nowait(exc)
+    else:
+        queue.put_nowait(_STREAM_DONE)
+
+
+async def _render_generated_code(
+    normalized_code: str,
+    status_msg: str,
+    is_fallback: bool = False,
+) -> DiagramGenerationResult:
+    """Render cleaned PlantUML code and package it as a generation result."""
     image_url = build_plantuml_image_url(normalized_code)
-    pil_image, status_msg = _fetch_plantuml_image(
+    png_bytes, _, status_msg = await _fetch_plantuml_image(
         image_url=image_url,
         status_msg=status_msg,
+        decode=False,
     )
     return DiagramGenerationResult(
         plantuml_code=normalized_code,
-        pil_image=pil_image,
+        pil_image=None,
         status_message=status_msg,
         image_url=image_url,
+        is_fallback=is_fallback,
+        png_bytes=png_bytes,
     )
 
 
-def render_diagram_from_code(plantuml_code: str) -> Tuple[Image.Image, str, str]:
+async def render_diagram_from_code(plantuml_code: str) -> Tuple[Image.Image, str, str]:
     """
     Re-renders an already generated PlantUML snippet.
     Returns a placeholder image if the render fails so the UI can continue gracefully.
     """
     image_url = build_plantuml_image_url(plantuml_code)
-    pil_image, status_msg = _fetch_plantuml_image(
+    _, pil_image, status_msg = await _fetch_plantuml_image(
         image_url=image_url,
         status_msg="Re-rendered from PlantUML code.",
     )
     if pil_image is None:
-        pil_image = _create_placeholder_image("Diagram preview unavailable")
+        pil_image = create_placeholder_image()
     return pil_image, status_msg, image_url
 
 
-def diagram_image_to_base64(image: Image.Image | None) -> Optional[str]:
-    """Encode a PIL image to a base64 PNG string."""
+async def render_png_from_code(plantuml_code: str) -> Tuple[bytes | None, str, str]:
+    """
+    Render a PlantUML snippet and return the server's PNG bytes untouched.
+    Returns ``None`` for the bytes when the render fails.
+    """
+    image_url = build_plantuml_image_url(plantuml_code)
+    png_bytes, _, status_msg = await _fetch_plantuml_image(
+        image_url=image_url,
+        status_msg="Re-rendered from PlantUML code.",
+        decode=False,
+    )
+    return png_bytes, status_msg, image_url
+
+
+def diagram_image_to_base64(image: Image.Image | bytes | None) -> Optional[str]:
+    """
+    Encode a diagram to a base64 PNG string.
+
+    Raw PNG bytes (as returned by the PlantUML server) are encoded directly; PIL images
+    are serialized to PNG first with fast, light compression since the result is
+    base64-inflated for transport anyway.
+    """
     if image is None:
         return None
+    if isinstance(image, (bytes, bytearray)):
+        return _b64.b64encode(image).decode("ascii")
     buf = io.BytesIO()
-    image.save(buf, format="PNG")
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode("utf-8")
+    image.save(buf, format="PNG", compress_level=1, optimize=False)
+    # Encode straight from the buffer's memory rather than copying it out with read().
+    return _b64.b64encode(buf.getbuffer()).decode("ascii")
 
 
 def build_plantuml_image_url(plantuml_code: str) -> str:
     """Build a PlantUML render URL for the given diagram code."""
     encoded = _plantuml_encode(plantuml_code)
-    return _build_plantuml_url(UMLBotConfig.PLANTUML_SERVER_URL_TEMPLATE, encoded)
+    prefix, suffix = _split_plantuml_url_template(UMLBotConfig.PLANTUML_SERVER_URL_TEMPLATE)
+    return f"{prefix}{encoded}{suffix}"
 
 
-def _build_plantuml_url(template: str, encoded: str) -> str:
+@functools.lru_cache(maxsize=8)
+def _split_plantuml_url_template(template: str) -> Tuple[str, str]:
     """
-    Support both full templates (with {encoded}) and base URLs.
+    Split a render URL template into the text before and after the encoded diagram.
+    Supports both full templates (with {encoded}) and base URLs; parsed once per template.
     """
     if "{encoded}" in template:
-        return template.format(encoded=encoded)
-    base = template.rstrip("/")
-    return f"{base}/{encoded}"
+        prefix, suffix = template.split("{encoded}", 1)
+        return prefix, suffix
+    return template.rstrip("/") + "/", ""
+
+
+def _clean_plantuml_code(text: str) -> str:
+    """Strip code fences and collapse doubled braces in one step over the LLM output."""
+    return _normalize_curly_braces(_strip_code_block_markers(text))
 
 
 def _strip_code_block_markers(text: str) -> str:
     """Remove triple-backtick code fences from a PlantUML snippet."""
-    stripped = re.sub(
-        r"^```(?:plantuml)?\s*|```$",
-        "",
-        text.strip(),
-        flags=re.MULTILINE,
-    )
-    return stripped.strip()
+    if "```" not in text:
+        return text.strip()
+    return _CODE_BLOCK_RE.sub("", text.strip()).strip()
 
 
 def _normalize_curly_braces(plantuml_code: str) -> str:
@@ -146,24 +455,34 @@ def _normalize_curly_braces(plantuml_code: str) -> str:
     Sometimes LLM output contains doubled braces like {{ ... }}, which breaks rendering.
     Collapse any repeated opening/closing braces into a single brace.
     """
-    normalized = re.sub(r"\{+", "{", plantuml_code)
-    normalized = re.sub(r"\}+", "}", normalized)
-    return normalized
+    if "{{" not in plantuml_code and "}}" not in plantuml_code:
+        return plantuml_code
+    return _BRACE_RUN_RE.sub(r"\1", plantuml_code)
 
 
-def _fetch_plantuml_image(
+async def _fetch_plantuml_image(
     image_url: str,
     status_msg: str,
-) -> Tuple[Image.Image | None, str]:
-    """Fetch and decode a PlantUML PNG image from the render server."""
+    decode: bool = True,
+) -> Tuple[bytes | None, Image.Image | None, str]:
+    """
+    Fetch a PlantUML PNG from the render server, returning raw bytes and a PIL view.
+    With ``decode=False`` the PIL view is skipped and only the bytes are returned.
+    Successful renders are cached by URL, so repeats skip the render server.
+    """
     try:
-        resp = requests.get(image_url, timeout=10)
+        png_bytes = _PNG_CACHE.get(image_url)
+        if png_bytes is not None:
+            return png_bytes, await _decode_png_async(png_bytes) if decode else None, status_msg
+        resp = await get_http_client().get(image_url)
         resp.raise_for_status()
         content_type = resp.headers.get("Content-Type", "")
         if not content_type.startswith("image/png"):
             status_msg += f" | PlantUML server error: Unexpected content-type '{content_type}'."
-            return None, status_msg
-        return Image.open(io.BytesIO(resp.content)), status_msg
+            return None, None, status_msg
+        png_bytes = resp.content
+        _PNG_CACHE.set(image_url, png_bytes)
+        return png_bytes, await _decode_png_async(png_bytes) if decode else None, status_msg
     except Exception as exc:
         LOGGER.warning("PlantUML rendering failed: %s", exc)
         failure_msg = f"PlantUML rendering failed: {exc}"
@@ -173,28 +492,62 @@ def _fetch_plantuml_image(
             status_msg = f"{status_msg} | {failure_msg}"
         else:
             status_msg = failure_msg
-        return None, status_msg
+        return None, None, status_msg
+
+
+def _decode_png(png_bytes: bytes) -> Image.Image:
+    """Decode PNG bytes eagerly so decode errors surface here rather than at save time."""
+    image = Image.open(io.BytesIO(png_bytes))
+    image.load()
+    return image
 
 
-def _create_placeholder_image(message: str) -> Image.Image:
+async def _decode_png_async(png_bytes: bytes) -> Image.Image:
+    """Decode PNG bytes in a worker thread so large diagrams do not stall the event loop."""
+    return await asyncio.to_thread(_decode_png, png_bytes)
+
+
+def create_placeholder_image(
+    message: str = "Diagram preview unavailable",
+    size: Tuple[int, int] = (400, 200),
+) -> Image.Image:
     """Create a placeholder image with a short error message."""
-    image = Image.new("RGB", (400, 200), color="white")
+    # Copy so callers may draw on the result without touching the cached original.
+    return _render_placeholder(message, size).copy()
+
+
+@functools.lru_cache(maxsize=8)
+def _render_placeholder(message: str, size: Tuple[int, int]) -> Image.Image:
+    """Draw each distinct placeholder once per process."""
+    # Drawing support is only needed on the error path, so it is imported on first use.
+    from PIL import ImageDraw
+
+    image = Image.new("RGB", size, color="white")
     draw = ImageDraw.Draw(image)
+    draw.text((20, 80), message, fill="red", font=_placeholder_font())
+    return image
+
+
+@functools.lru_cache(maxsize=1)
+def _placeholder_font() -> ImageFont.ImageFont | ImageFont.FreeTypeFont:
+    """Load the placeholder font once per process, falling back to PIL's default."""
+    from PIL import ImageFont
+
     try:
-        font = ImageFont.truetype("arial.ttf", 24)
+        return ImageFont.truetype("arial.ttf", 24)
     except Exception:
-        font = ImageFont.load_default()
-    draw.text((20, 80), message, fill="red", font=font)
-    return image
+        return ImageFont.load_default()
 
 
+@functools.lru_cache(maxsize=512)
 def _plantuml_encode(text: str) -> str:
-    """Encode PlantUML text for the server URL format."""
-    compressor = zlib.compressobj(level=9, wbits=-15)
-    compressed = compressor.compress(text.encode("utf-8")) + compressor.flush()
-    b64 = base64.b64encode(compressed).decode("utf-8")
-    translation = str.maketrans(
-        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
-        "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_",
+    """
+    Encode PlantUML text for the server URL format.
+
+    Re-renders and chat iterations often submit identical code, and the encoded form doubles
+    as the render-cache key, so results are memoized per process.
+    """
+    compressed = _zlib.compress(
+        text.encode("utf-8"), level=_PLANTUML_COMPRESSION_LEVEL, wbits=-15
     )
-    return b64.translate(translation)
+    return _b64.b64encode(compressed).translate(_PLANTUML_B64_TRANSLATION).decode("ascii")
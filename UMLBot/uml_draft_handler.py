@@ -17,18 +17,60 @@ class UMLRetryManager:
         max_retries (int): Maximum number of retries allowed.
         attempt (int): Current attempt number.
         errors (list[str]): List of error messages from each failed attempt.
+        backoff_base (float): Base delay in seconds for transient-error retries.
+        backoff_cap (float): Maximum delay in seconds for transient-error retries.
+
+    Only ``LLMError`` and transient failures are worth retrying; ``is_retryable`` reports
+    whether the most recent error was one of them.
     """
 
-    def __init__(self, max_retries: int = 3) -> None:
-        """Initialize the retry manager with a maximum retry count."""
+    TRANSIENT_STATUS_CODES = frozenset({408, 429, 502, 503, 504})
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+    ) -> None:
+        """Initialize the retry manager with a maximum retry count and backoff bounds."""
         self.max_retries = max_retries
         self.attempt = 0
         self.errors: list[str] = []
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._last_retryable = False
 
     def record_error(self, error: Exception) -> None:
         """Record an error and increment the attempt counter."""
         self.attempt += 1
         self.errors.append(str(error))
+        self._last_retryable = isinstance(error, LLMError) or _is_transient(
+            error, self.TRANSIENT_STATUS_CODES
+        )
+
+    def is_retryable(self) -> bool:
+        """Return True when the most recent error was an LLM or transient failure."""
+        return self._last_retryable
+
+    def backoff_seconds(self) -> float:
+        """
+        Return the delay before the next attempt.
+
+        Only retryable errors (``LLMError``, throttling, gateway/timeout statuses, transport
+        failures) back off; the delay grows exponentially with the attempt count and is
+        jittered so concurrent callers do not retry in lockstep. Other failures are not
+        retried, so their delay is zero.
+        """
+        if not self._last_retryable:
+            return 0.0
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** (self.attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def sleep(self) -> None:
+        """Block for the current backoff delay (for synchronous callers)."""
+        delay = self.backoff_seconds()
+        if delay:
+            time.sleep(delay)
 
     def should_retry(self) -> bool:
         """Return True when another retry attempt is allowed."""
@@ -43,9 +85,69 @@ class UMLRetryManager:
         return "\n".join(f"Attempt {i+1}: {msg}" for i, msg in enumerate(self.errors))
 
 
+import asyncio
 import logging
+import random
+import re
+import time
 from pathlib import Path
-from typing import Optional, Any
+from typing import Any, AsyncIterator, Collection, Optional
+
+import httpx
+
+from UMLBot.exceptions import LLMError
+
+LOGGER = logging.getLogger(__name__)
+
+# Prompt template validation patterns, compiled once at import time.
+_JINJA2_TAG_RE = re.compile(r"(\{\{.*?\}\}|\{%.*?%\})")
+_PY_PLACEHOLDER_RE = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
+_PY_EMPTY_PLACEHOLDER_RE = re.compile(r"\{\s*\}")
+_PY_MALFORMED_PLACEHOLDER_RE = re.compile(r"\{[^a-zA-Z_][^}]*\}")
+_JINJA2_VAR_RE = re.compile(r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\}\}")
+_JINJA2_BLOCK_RE = re.compile(r"\{%\s*([a-zA-Z_][a-zA-Z0-9_ ]*)\s*%\}")
+_JINJA2_UNCLOSED_VAR_RE = re.compile(r"\{\{[^\}]*$")
+_JINJA2_UNCLOSED_BLOCK_RE = re.compile(r"\{%[^\}]*$")
+_THEME_JINJA2_RE = re.compile(r"\{\{\s*theme\s*\}\}")
+_THEME_PY_RE = re.compile(r"\{theme\}")
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Best-effort extraction of an HTTP status code from an LLM client exception."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_transient(error: Optional[BaseException], status_codes: Collection[int]) -> bool:
+    """Return True for throttling, timeout, and transport errors anywhere in the cause chain."""
+    while error is not None:
+        if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+            return True
+        if _status_code(error) in status_codes:
+            return True
+        error = error.__cause__
+    return False
+
+
+def _prompt_input(prompt: Any) -> Any:
+    """
+    Convert a constructed prompt into LLM input.
+    Langchain prompt values contribute their first message's content; strings pass through.
+    """
+    # Extract messages if present (Langchain ChatPromptValue)
+    if hasattr(prompt, "to_messages"):
+        messages = prompt.to_messages()
+    elif hasattr(prompt, "messages"):
+        messages = prompt.messages
+    elif isinstance(prompt, str):
+        return prompt
+    else:
+        raise TypeError("Prompt is not a recognized type for LLM input.")
+    if messages and hasattr(messages[0], "content"):
+        return messages[0].content
+    return messages
 
 
 def escape_curly_braces(val: Optional[str]) -> Optional[str]:
@@ -56,8 +158,9 @@ def escape_curly_braces(val: Optional[str]) -> Optional[str]:
     Returns:
         Optional[str]: String with '{' replaced by '{{' and '}' replaced by '}}'.
     """
-    if val is None:
+    if val is None or ("{" not in val and "}" not in val):
         return val
+    # Two C-level replace passes beat str.translate and per-character loops here.
     return val.replace("{", "{{").replace("}", "}}")
 
 
@@ -80,6 +183,8 @@ class UMLDraftHandler(WorkflowHandler):
             Path(__file__).resolve().parent.parent / "assets" / "uml_diagram.prompty"
         )
         self.config = config or UMLBotConfig()
+        self._prompt_template: Any = None
+        self._prompt_mtime: Optional[float] = None
 
     def _validate_prompt_template(self, template: str) -> None:
         """
@@ -102,34 +207,28 @@ class UMLDraftHandler(WorkflowHandler):
             Jinja2 style:
                 "Generate a {{ diagram_type }} diagram for: {{ description }} {% if theme %}Theme: {{ theme }}{% endif %}"
         """
-        import re
-
         # Remove all Jinja2 tags for Python-style validation
-        jinja2_tag_pattern = r"(\{\{.*?\}\}|\{%.*?%\})"
-        template_no_jinja2 = re.sub(jinja2_tag_pattern, "", template)
+        template_no_jinja2 = _JINJA2_TAG_RE.sub("", template)
 
         # 1. Python-style placeholder validation (only on non-Jinja2 content)
-        py_placeholder_pattern = r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}"
-        py_placeholders = set(re.findall(py_placeholder_pattern, template_no_jinja2))
+        py_placeholders = set(_PY_PLACEHOLDER_RE.findall(template_no_jinja2))
 
         # Malformed Python-style: empty {}, non-identifier, or unclosed
         malformed_py = []
-        if re.search(r"\{\s*\}", template_no_jinja2):
+        if _PY_EMPTY_PLACEHOLDER_RE.search(template_no_jinja2):
             malformed_py.append("Empty Python-style placeholder")
-        if re.search(r"\{[^a-zA-Z_][^}]*\}", template_no_jinja2):
+        if _PY_MALFORMED_PLACEHOLDER_RE.search(template_no_jinja2):
             malformed_py.append("Malformed Python-style placeholder")
         if template_no_jinja2.count("{") != template_no_jinja2.count("}"):
             malformed_py.append("Unbalanced curly braces in Python-style section")
 
         # 2. Jinja2-style placeholder validation (only on Jinja2 tags)
-        jinja2_var_pattern = r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\}\}"
-        jinja2_placeholders = set(re.findall(jinja2_var_pattern, template))
-        jinja2_block_pattern = r"\{%\s*([a-zA-Z_][a-zA-Z0-9_ ]*)\s*%\}"
-        jinja2_blocks = re.findall(jinja2_block_pattern, template)
+        jinja2_placeholders = set(_JINJA2_VAR_RE.findall(template))
+        jinja2_blocks = _JINJA2_BLOCK_RE.findall(template)
 
         # Malformed Jinja2: unclosed or incomplete tags
         malformed_jinja2 = []
-        if re.search(r"\{\{[^\}]*$", template) or re.search(r"\{%[^\}]*$", template):
+        if _JINJA2_UNCLOSED_VAR_RE.search(template) or _JINJA2_UNCLOSED_BLOCK_RE.search(template):
             malformed_jinja2.append("Unclosed Jinja2 tag")
         if template.count("{{") != template.count("}}"):
             malformed_jinja2.append("Unbalanced Jinja2 variable tags")
@@ -152,8 +251,8 @@ class UMLDraftHandler(WorkflowHandler):
         # 4. If 'theme' is referenced, ensure it's a valid placeholder in either style
         theme_referenced = (
             "theme" in template
-            or re.search(r"\{\{\s*theme\s*\}\}", template)
-            or re.search(r"\{theme\}", template)
+            or _THEME_JINJA2_RE.search(template)
+            or _THEME_PY_RE.search(template)
         )
         theme_present = "theme" in all_placeholders
         if theme_referenced and not theme_present:
@@ -162,6 +261,20 @@ class UMLDraftHandler(WorkflowHandler):
             )
         # All checks passed
 
+    def _load_prompt_template(self) -> Any:
+        """
+        Return the parsed prompty template, re-parsing only when the file's mtime changes.
+        Retries and later requests on this handler reuse the parsed template.
+        """
+        try:
+            mtime = self.prompty_path.stat().st_mtime
+        except OSError:
+            mtime = None
+        if self._prompt_template is None or mtime != self._prompt_mtime:
+            self._prompt_template = self.load_prompty()
+            self._prompt_mtime = mtime
+        return self._prompt_template
+
     def construct_prompt(
         self,
         diagram_type: str,
@@ -183,7 +296,7 @@ class UMLDraftHandler(WorkflowHandler):
             FileNotFoundError: If prompty file is missing.
             ValueError: If prompty file is invalid.
         """
-        prompt_template = self.load_prompty()
+        prompt_template = self._load_prompt_template()
         # Ensure prompt_template is a ChatPromptTemplate and validate its template
         # Skipping prompt template validation for now:
         # if hasattr(self, "_validate_prompt_template"):
@@ -205,6 +318,7 @@ class UMLDraftHandler(WorkflowHandler):
     ) -> str:
         """
         Generates a UML diagram using the LLM and prompty template, with error handling and retry logic.
+        Only ``LLMError`` and transient failures are retried.
 
         Args:
             diagram_type (str): Type of UML diagram to generate.
@@ -223,37 +337,75 @@ class UMLDraftHandler(WorkflowHandler):
             retry_manager = UMLRetryManager(max_retries=3)
         while retry_manager.should_retry():
             try:
-                prompt = self.construct_prompt(diagram_type, description, theme)
                 if llm_interface is None:
                     raise ValueError("LLM interface must be provided for diagram generation.")
-                # Extract messages if present (Langchain ChatPromptValue)
-                if hasattr(prompt, "to_messages"):
-                    messages = prompt.to_messages()
-                    if messages and hasattr(messages[0], "content"):
-                        prompt_input = messages[0].content
-                    else:
-                        prompt_input = messages
-                elif hasattr(prompt, "messages"):
-                    messages = prompt.messages
-                    if messages and hasattr(messages[0], "content"):
-                        prompt_input = messages[0].content
-                    else:
-                        prompt_input = messages
-                elif isinstance(prompt, str):
-                    prompt_input = prompt
-                else:
-                    raise TypeError("Prompt is not a recognized type for LLM input.")
+                prompt_input = _prompt_input(
+                    self.construct_prompt(diagram_type, description, theme)
+                )
+            except Exception as exc:
+                # Missing interfaces and template/prompt problems are deterministic; retrying
+                # cannot fix them.
+                retry_manager.record_error(exc)
+                LOGGER.error("UML prompt construction failed; not retrying: %s", exc)
+                break
+            try:
                 response = llm_interface.invoke(prompt_input)
                 diagram_code = self.check_content_type(response)
                 return diagram_code
             except Exception as exc:
                 retry_manager.record_error(exc)
-                logging.exception(
-                    "UML diagram generation failed (attempt %s)", retry_manager.attempt
+                # The caller logs the final failure with a traceback; per-attempt records only
+                # carry one when debugging.
+                LOGGER.warning(
+                    "UML diagram generation failed (attempt %s): %s",
+                    retry_manager.attempt,
+                    exc,
+                    exc_info=LOGGER.isEnabledFor(logging.DEBUG),
                 )
-        # After max retries, raise with error context
+                if not retry_manager.is_retryable():
+                    # Bad output and programming errors repeat identically on retry.
+                    break
+                if retry_manager.should_retry():
+                    retry_manager.sleep()
+        # After max retries (or a non-retriable error), raise with error context
         error_msg = (
-            f"UML diagram generation failed after {retry_manager.max_retries} attempts.\n"
+            f"UML diagram generation failed after {retry_manager.attempt} attempts.\n"
             f"Error context:\n{retry_manager.error_context()}"
         )
         raise RuntimeError(error_msg)
+
+    async def process_stream_async(
+        self,
+        diagram_type: str,
+        description: str,
+        theme: Optional[str] = None,
+        llm_interface: Optional[Any] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream PlantUML text from the LLM as it is generated.
+
+        Uses the interface's ``astream`` when available and otherwise yields the full
+        ``invoke`` response (run in a worker thread) as a single chunk. Partial output
+        cannot be retried, so errors propagate to the caller instead.
+
+        Args:
+            diagram_type (str): Type of UML diagram to generate.
+            description (str): Description of the system/process to diagram.
+            theme (Optional[str]): PlantUML theme/style.
+            llm_interface: LLM interface with ``astream()`` or ``.invoke()``.
+
+        Yields:
+            str: Successive pieces of the PlantUML diagram code.
+        """
+        if llm_interface is None:
+            raise ValueError("LLM interface must be provided for diagram generation.")
+        prompt_input = _prompt_input(self.construct_prompt(diagram_type, description, theme))
+        astream = getattr(llm_interface, "astream", None)
+        if astream is None:
+            response = await asyncio.to_thread(llm_interface.invoke, prompt_input)
+            yield self.check_content_type(response)
+            return
+        async for chunk in astream(prompt_input):
+            text = getattr(chunk, "content", chunk)
+            if text:
+                yield text
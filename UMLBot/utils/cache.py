@@ -0,0 +1,69 @@
+"""In-process caching helpers shared by the service and API layers."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+def hash_key(*parts: str | None) -> str:
+    """Hash whitespace-stripped string parts (``None`` as empty) into a compact cache key."""
+    raw = "\x00".join((part or "").strip() for part in parts)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire a fixed number of seconds after insertion.
+
+    Args:
+        maxsize (int): Maximum number of entries kept; the least recently used entry is
+            evicted first.
+        ttl (float): Lifetime of an entry in seconds. Non-positive values disable expiry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0) -> None:
+        """Initialize an empty cache with the given size and lifetime bounds."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` when missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        """Return the number of stored entries, including ones that have not been purged yet."""
+        return len(self._data)
+
+
+__all__ = ["TTLCache", "hash_key"]
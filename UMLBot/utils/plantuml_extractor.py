@@ -16,11 +16,27 @@ Example:
 
 import re
 
+_CODE_BLOCK_RE = re.compile(r"```(?:plantuml)?\s*([\s\S]*?)```")
+_UML_RE = re.compile(r"@startuml[\s\S]*?@enduml")
+_FENCE_MARKER_RE = re.compile(r"^```(?:plantuml)?\s*|```$", re.MULTILINE)
+
+
+def _strip_fence_markers(block: str) -> str:
+    """Remove code block markers left at line boundaries inside a block."""
+    block = block.strip()
+    if "```" not in block:
+        return block
+    return _FENCE_MARKER_RE.sub("", block).strip()
+
 
 def extract_last_plantuml_block(text: str) -> str:
     """
     Extracts the last valid PlantUML code block from the input text.
 
+    A single forward scan keeps only the last ``@startuml ... @enduml`` span, which is
+    what the last valid block always is when one exists; fenced blocks are consulted
+    only if no such span is found.
+
     Args:
         text (str): The chat response string.
 
@@ -30,27 +46,18 @@ def extract_last_plantuml_block(text: str) -> str:
     Raises:
         ValueError: If no valid PlantUML block is found.
     """
-    # Find all code blocks: ```plantuml ... ``` or ``` ... ```
-    code_block_pattern = re.compile(r"```(?:plantuml)?\s*([\s\S]*?)```", re.MULTILINE)
-    blocks = code_block_pattern.findall(text)
-
-    # Also find any @startuml ... @enduml blocks outside code blocks
-    uml_pattern = re.compile(r"@startuml[\s\S]*?@enduml", re.MULTILINE)
-    blocks += uml_pattern.findall(text)
-
-    # Filter for valid PlantUML blocks
-    valid_blocks = []
-    for block in blocks:
-        block_stripped = block.strip()
-        # Remove code block markers if present
-        block_stripped = re.sub(
-            r"^```(?:plantuml)?\s*|```$", "", block_stripped, flags=re.MULTILINE
-        ).strip()
-        if "@startuml" in block_stripped and "@enduml" in block_stripped:
-            valid_blocks.append(block_stripped)
-
-    if not valid_blocks:
+    if "@startuml" not in text or "@enduml" not in text:
         raise ValueError("No valid PlantUML block found in response.")
 
-    # Return the last valid block
-    return valid_blocks[-1]
+    last = None
+    for last in _UML_RE.finditer(text):
+        pass
+    if last is not None:
+        return _strip_fence_markers(last.group())
+
+    # Fenced blocks can still hold both markers out of order (@enduml before @startuml).
+    for block in reversed(_CODE_BLOCK_RE.findall(text)):
+        block = _strip_fence_markers(block)
+        if "@startuml" in block and "@enduml" in block:
+            return block
+    raise ValueError("No valid PlantUML block found in response.")
@@ -6,12 +6,13 @@ Gradio-based UML Diagram Generator App
 - Orchestrates DiagramBuilder, Validator, PlantUML rendering, and preview/download
 """
 
+import asyncio
 import logging
 import sys
 from pathlib import Path
 
 import gradio as gr
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
 # Workaround for local llm_utils and UMLBot import
 repo_root = Path(__file__).resolve().parent
@@ -21,10 +22,12 @@ sys.path.append(str(repo_root))
 from UMLBot.api_server import create_api_app
 from UMLBot.config.config import UMLBotConfig
 from UMLBot.services import (
+    create_placeholder_image,
     generate_diagram_from_description,
+    get_shared_handler,
     render_diagram_from_code,
 )
-from UMLBot.uml_draft_handler import UMLDraftHandler
+from UMLBot.uml_draft_handler import UMLRetryManager, escape_curly_braces
 from llm_utils.aiweb_common.generate.ChatResponse import ChatResponseHandler
 
 
@@ -113,7 +116,7 @@ with gr.Blocks(title="UML Diagram Generator") as demo:
         """
     )
 
-    def on_chat_submit(user_input, chat_history, plantuml_code_text, diagram_type):
+    async def on_chat_submit(user_input, chat_history, plantuml_code_text, diagram_type):
         """
         Handles submission of a UML change suggestion in the chat workflow.
         Calls the LLM backend and updates the chat and diagram preview.
@@ -121,19 +124,18 @@ with gr.Blocks(title="UML Diagram Generator") as demo:
         Robust error handling: if any error occurs, previous code/diagram remain visible and user receives feedback.
 
         The selected diagram_type is injected into the prompt for the LLM backend.
+        The submitted message is shown before the LLM is called, and the final update follows
+        once the response has been parsed and rendered.
         """
         logging.basicConfig(level=logging.DEBUG)
-        if not chat_history:
-            chat_history = []
+        # Copy once so appends below never mutate the session state passed in by Gradio.
+        chat_history = list(chat_history or [])
 
         # Escape curly braces in user input and PlantUML code to avoid template variable mismatch
-        def escape_curly(text: str) -> str:
-            return text.replace("{", "{{").replace("}", "}}")
-
-        safe_user_input = escape_curly(user_input)
-        safe_plantuml_code = escape_curly(plantuml_code_text.strip())
+        safe_user_input = escape_curly_braces(user_input)
+        safe_plantuml_code = escape_curly_braces(plantuml_code_text.strip())
         # Add user suggestion
-        chat_history = chat_history + [{"role": "user", "content": user_input}]
+        chat_history.append({"role": "user", "content": user_input})
         # Compose single system message, injecting diagram_type
         system_msg = (
             f"Diagram type: {diagram_type}\n"
@@ -144,30 +146,27 @@ with gr.Blocks(title="UML Diagram Generator") as demo:
             "```\n"
             "Please return only the updated PlantUML code."
         )
-        chat_history = chat_history + [{"role": "system", "content": system_msg}]
-
-        # Prepare messages for LLM backend (role mapping for ChatResponseHandler)
-        messages = []
-        for msg in chat_history:
-            if msg["role"] == "user":
-                messages.append({"role": "human", "content": msg["content"]})
-            elif msg["role"] == "assistant":
-                messages.append({"role": "ai", "content": msg["content"]})
-            elif msg["role"] == "system":
-                messages.append({"role": "system", "content": msg["content"]})
-            elif msg["role"] == "error":
-                messages.append({"role": "error", "content": msg["content"]})
-
-        # Call the LLM backend with retry logic
-        handler = UMLDraftHandler()
-        handler._init_openai(
-            openai_compatible_endpoint=UMLBotConfig.LLM_API_BASE,
-            openai_compatible_key=UMLBotConfig.LLM_API_KEY,
-            openai_compatible_model=UMLBotConfig.LLM_MODEL,
-            name="UMLBot",
+        chat_history.append({"role": "system", "content": system_msg})
+        # Show the request right away; the code window and preview keep their current values.
+        yield (
+            format_chat_history(chat_history),
+            "",
+            plantuml_code_text,
+            gr.update(),
+            "Generating updated diagram...",
         )
-        from UMLBot.uml_draft_handler import UMLRetryManager
 
+        # Prepare messages for LLM backend (roles as named by ChatResponseHandler)
+        # Each turn is self-contained: the system message carries the current code, so earlier
+        # turns (kept for display only) are not resent and the prompt stays constant-size.
+        messages = [
+            {"role": "human", "content": user_input},
+            {"role": "system", "content": system_msg},
+        ]
+
+        # Call the LLM backend with retry logic, reusing the handler (and its LLM client)
+        # shared with the generate path.
+        handler = get_shared_handler()
         retry_manager = UMLRetryManager(max_retries=3)
         raw_response = None
         error_feedback = ""
@@ -177,17 +176,19 @@ with gr.Blocks(title="UML Diagram Generator") as demo:
                 chat_response_handler = ChatResponseHandler(
                     handler.llm_interface, prompt=system_msg
                 )
-                chat_response = chat_response_handler.generate_response(messages)
+                chat_response = await asyncio.to_thread(
+                    chat_response_handler.generate_response, messages
+                )
                 raw_response = chat_response.response.content
                 extracted_plantuml = extract_last_plantuml_block(raw_response)
                 plantuml_code_text = extracted_plantuml
-                pil_image, status_msg = on_rerender(plantuml_code_text)
-                chat_history = chat_history + [{"role": "assistant", "content": raw_response}]
+                pil_image, status_msg = await on_rerender(plantuml_code_text)
+                chat_history.append({"role": "assistant", "content": raw_response})
                 break
             except Exception as e:
                 retry_manager.record_error(e)
                 error_msg = f"Attempt {attempt}: UML rendering failed: {e}"
-                chat_history = chat_history + [{"role": "error", "content": error_msg}]
+                chat_history.append({"role": "error", "content": error_msg})
                 pil_image = None
                 status_msg = error_msg
                 error_feedback = f"⚠️ {error_msg}"
@@ -198,44 +199,42 @@ with gr.Blocks(title="UML Diagram Generator") as demo:
                     break
 
         # For Gradio Chatbot, display all messages (user, assistant, system, error)
-        gradio_chat_history = []
-        for msg in chat_history:
-            # Format error/system messages for UI clarity
-            if msg["role"] == "error":
-                gradio_chat_history.append({"role": "error", "content": f"❌ {msg['content']}"})
-            elif msg["role"] == "system":
-                gradio_chat_history.append({"role": "system", "content": f"ℹ️ {msg['content']}"})
-            else:
-                gradio_chat_history.append({"role": msg["role"], "content": msg["content"]})
-
-        # Return chat history, clear chat input, update code window, image, and status
+        # Emit chat history, clear chat input, update code window, image, and status
         # Ensure pil_image is always defined
-        return gradio_chat_history, "", plantuml_code_text, pil_image, error_feedback
+        yield format_chat_history(chat_history), "", plantuml_code_text, pil_image, error_feedback
 
     # --- Existing handlers ---
     def _placeholder_image(width: int = 600, height: int = 300) -> Image.Image:
-        image = Image.new("RGB", (width, height), color="white")
-        draw = ImageDraw.Draw(image)
-        try:
-            font = ImageFont.truetype("arial.ttf", 24)
-        except Exception:
-            font = ImageFont.load_default()
-        draw.text((20, 80), "Diagram preview unavailable", fill="red", font=font)
-        return image
-
-    def on_generate(desc, dtype):
-        result = generate_diagram_from_description(desc, dtype)
-        pil_image = result.pil_image or _placeholder_image()
+        return create_placeholder_image(size=(width, height))
+
+    def _fit_preview(pil_image):
+        """Downscale renders wider than the preview limit so the browser gets fewer bytes."""
+        max_width = UMLBotConfig.PREVIEW_MAX_WIDTH
+        if pil_image is None or max_width <= 0 or pil_image.width <= max_width:
+            return pil_image
+        height = max(1, round(pil_image.height * max_width / pil_image.width))
+        # reducing_gap shrinks by an integer factor with reduce() before the LANCZOS pass,
+        # which is cheaper on very large renders and visually indistinguishable at 3.0.
+        return pil_image.resize(
+            (max_width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+        )
+
+    def _load_preview(result):
+        return _fit_preview(result.load_image())
+
+    async def on_generate(desc, dtype):
+        result = await generate_diagram_from_description(desc, dtype)
+        pil_image = await asyncio.to_thread(_load_preview, result) or _placeholder_image()
         return result.plantuml_code, pil_image, result.status_message
 
-    def on_rerender(plantuml_code_text):
+    async def on_rerender(plantuml_code_text):
         """
         Re-render diagram image from user-edited PlantUML code.
         Does not change the code box content.
         Only the CURRENT code box value is used to generate the diagram image.
         """
-        pil_image, status_msg, _ = render_diagram_from_code(plantuml_code_text)
-        return pil_image, status_msg
+        pil_image, status_msg, _ = await render_diagram_from_code(plantuml_code_text)
+        return await asyncio.to_thread(_fit_preview, pil_image), status_msg
 
     # --- Chat-based UML revision workflow with error handling ---
 
@@ -251,10 +250,11 @@ with gr.Blocks(title="UML Diagram Generator") as demo:
         fn=on_chat_submit,
         inputs=[chat_input, chat_state, plantuml_code, diagram_type_dropdown],
         outputs=[chatbox, chat_input, plantuml_code, image, status],
-        queue=False,
     )
 
-    # Add a button for submitting revised UML code (for error correction workflow)
+# Gradio runs one event at a time per handler by default; let concurrent users overlap up to
+# the same bound the service layer applies to LLM calls.
+demo.queue(default_concurrency_limit=UMLBotConfig.LLM_MAX_CONCURRENCY)
 app = gr.mount_gradio_app(create_api_app(), demo, path="/")
 
 if __name__ == "__main__":
@@ -31,8 +31,11 @@ dev_packages = [
     "pytest",
     "pytest-asyncio",
     "pytest-mock",
+    "pytest-xdist",
 ]
 
+perf_packages = ["isal", "orjson", "pybase64", "uvicorn[standard]"]
+
 # Define our package
 setup(
     name="UMLBot",
@@ -44,6 +47,10 @@ setup(
     python_requires=">=3.8",
     packages=find_packages(),
     install_requires=[required_packages],
-    extras_require={"dev": docs_packages + style_packages + dev_packages, "docs": docs_packages},
+    extras_require={
+        "dev": docs_packages + style_packages + dev_packages,
+        "docs": docs_packages,
+        "perf": perf_packages,
+    },
     dependency_links=dependency_links,
 )
@@ -0,0 +1,46 @@
+"""
+Shared pytest fixtures for the UMLBot test suite.
+"""
+
+import os
+
+import pytest
+
+# Runs in every (xdist worker) process before UMLBot reads its secrets at import time.
+os.environ.setdefault("azure_proxy_key", "test-key")
+
+from UMLBot.config.config import UMLBotConfig
+from UMLBot.uml_draft_handler import UMLDraftHandler
+
+
+class DummyPrompt:
+    def __init__(self, template):
+        self.template = template
+
+    def format_prompt(self, **kwargs):
+        return f"Diagram: {kwargs.get('diagram_type')}, Desc: {kwargs.get('description')}, Theme: {kwargs.get('theme', '')}"
+
+
+@pytest.fixture(scope="session")
+def uml_config():
+    """One read-only UMLBotConfig shared by every test."""
+    return UMLBotConfig()
+
+
+@pytest.fixture
+def dummy_prompt_class():
+    """The prompt stand-in returned by the stubbed ``load_prompty``."""
+    return DummyPrompt
+
+
+@pytest.fixture
+def stubbed_handler_class(monkeypatch):
+    """Stub the prompty template and response content check on UMLDraftHandler for one test."""
+    monkeypatch.setattr(UMLDraftHandler, "load_prompty", lambda self: DummyPrompt("template"))
+    monkeypatch.setattr(UMLDraftHandler, "check_content_type", lambda self, response: response)
+
+
+@pytest.fixture
+def uml_handler(stubbed_handler_class, uml_config):
+    """Fresh UMLDraftHandler whose class-level template and content check are stubbed."""
+    return UMLDraftHandler(config=uml_config)
@@ -1,5 +1,4 @@
-import os
-
+import json
 import os
 
 import pytest
@@ -12,19 +11,22 @@ from UMLBot.api_server import create_api_app
 from UMLBot.services.diagram_service import DiagramGenerationResult
 
 
-@pytest.fixture
+_RESULT = DiagramGenerationResult(
+    plantuml_code="@startuml\n@enduml",
+    pil_image=Image.new("RGB", (10, 10), color="white"),
+    status_message="Diagram generated successfully",
+    image_url="http://example.com/uml.png",
+)
+
+
+@pytest.fixture(scope="module")
 def client():
     def fake_generate(description, diagram_type, theme=None):
-        image = Image.new("RGB", (10, 10), color="white")
-        return DiagramGenerationResult(
-            plantuml_code="@startuml\n@enduml",
-            pil_image=image,
-            status_message="Diagram generated successfully",
-            image_url="http://example.com/uml.png",
-        )
+        return _RESULT
 
-    app = create_api_app(generate_fn=fake_generate)
-    return TestClient(app)
+    # The fake generator is stateless, so one app (and one lifespan run) serves every test.
+    with TestClient(create_api_app(generate_fn=fake_generate)) as test_client:
+        yield test_client
 
 
 def test_generate_diagram_success(client):
@@ -34,9 +36,12 @@ def test_generate_diagram_success(client):
     )
     assert resp.status_code == 200
     data = resp.json()
-    assert data["status"] == "ok"
-    assert data["plantuml_code"].startswith("@startuml")
-    assert data["image_url"] == "http://example.com/uml.png"
+    expected = {
+        "status": "ok",
+        "plantuml_code": "@startuml\n@enduml",
+        "image_url": "http://example.com/uml.png",
+    }
+    assert expected.items() <= data.items()
     assert data["image_base64"] is not None
 
 
@@ -45,3 +50,96 @@ def test_generate_diagram_missing_fields(client):
     assert resp.status_code == 400
     data = resp.json()
     assert data["status"] == "error"
+
+
+def test_generate_diagram_validation_error_names_fields(client):
+    resp = client.post("/api/generate", json={"description": "", "diagram_type": "class"})
+    assert resp.status_code == 400
+    assert resp.json() == {
+        "status": "error",
+        "message": "Missing or invalid fields: description",
+    }
+
+
+def test_render_accepts_code_alias(client, monkeypatch):
+    async def fake_render(plantuml_code):
+        return b"png", f"rendered {plantuml_code}", "http://example.com/uml.png"
+
+    monkeypatch.setattr("UMLBot.api_server.render_png_from_code", fake_render)
+    resp = client.post("/api/render", json={"code": "@startuml\n@enduml"})
+    assert resp.status_code == 200
+    assert resp.json()["message"] == "rendered @startuml\n@enduml"
+
+
+def test_render_falls_back_to_code_when_plantuml_code_is_empty(client, monkeypatch):
+    async def fake_render(plantuml_code):
+        return b"png", f"rendered {plantuml_code}", "http://example.com/uml.png"
+
+    monkeypatch.setattr("UMLBot.api_server.render_png_from_code", fake_render)
+    resp = client.post("/api/render", json={"plantuml_code": "", "code": "@startuml\n@enduml"})
+    assert resp.status_code == 200
+    assert resp.json()["message"] == "rendered @startuml\n@enduml"
+
+
+def test_generate_diagram_repeat_request_is_cached():
+    calls = []
+
+    def counting_generate(description, diagram_type, theme=None):
+        calls.append(description)
+        return _RESULT
+
+    client = TestClient(create_api_app(generate_fn=counting_generate))
+    payload = {"diagram_type": "class", "description": "Cached diagram"}
+    first = client.post("/api/generate", json=payload)
+    second = client.post("/api/generate", json=payload)
+    assert first.json() == second.json()
+    assert calls == ["Cached diagram"]
+
+
+def test_generate_batch_isolates_item_errors(client):
+    resp = client.post(
+        "/api/generate_batch",
+        json={
+            "items": [
+                {"diagram_type": "class", "description": "First"},
+                {"diagram_type": "class"},
+                {"diagram_type": "sequence", "description": "Third"},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [item["status"] for item in results] == ["ok", "error", "ok"]
+    assert results[0]["image_base64"] is not None
+
+
+def test_generate_batch_requires_items(client):
+    resp = client.post("/api/generate_batch", json={"items": []})
+    assert resp.status_code == 400
+    assert resp.json()["status"] == "error"
+
+
+def test_generate_stream_emits_tokens_then_result():
+    async def fake_stream(description, diagram_type, theme=None):
+        yield "@startuml\n"
+        yield "@enduml"
+        yield DiagramGenerationResult(
+            plantuml_code="@startuml\n@enduml",
+            pil_image=None,
+            status_message="Diagram generated successfully",
+            image_url="http://example.com/uml.png",
+            png_bytes=b"png",
+        )
+
+    client = TestClient(create_api_app(stream_fn=fake_stream))
+    resp = client.post(
+        "/api/generate/stream", json={"diagram_type": "class", "description": "Streamed"}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line.strip()
+    ]
+    assert [event["type"] for event in events] == ["token", "token", "result"]
+    assert events[-1]["status"] == "ok"
+    assert events[-1]["plantuml_code"] == "@startuml\n@enduml"
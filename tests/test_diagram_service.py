@@ -0,0 +1,253 @@
+"""
+Unit tests for the diagram service helpers (PlantUML encoding and image serialization).
+"""
+
+import asyncio
+import base64
+import io
+import zlib
+
+import pytest
+from PIL import Image
+
+from UMLBot.services import diagram_service
+from UMLBot.services.diagram_service import (
+    DiagramGenerationResult,
+    _clean_plantuml_code,
+    _split_plantuml_url_template,
+    _normalize_curly_braces,
+    _plantuml_encode,
+    _strip_code_block_markers,
+    diagram_image_to_base64,
+)
+
+_PLANTUML_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_"
+_PLANTUML_TO_STD = str.maketrans(
+    _PLANTUML_ALPHABET,
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+)
+
+
+def _plantuml_decode(encoded: str) -> str:
+    raw = base64.b64decode(encoded.translate(_PLANTUML_TO_STD))
+    return zlib.decompress(raw, wbits=-15).decode("utf-8")
+
+
+class _FakeHandler:
+    llm_interface = None
+
+    def _init_openai(self, **kwargs):
+        pass
+
+
+@pytest.fixture
+def use_fake_handler(monkeypatch):
+    """
+    Configure the service with fake LLM settings, renders, and an empty code cache.
+    Yields a function that installs a handler class; the shared handler is reset on teardown.
+    """
+
+    async def fake_fetch(image_url, status_msg, decode=True):
+        return b"png", None, status_msg
+
+    monkeypatch.setattr(diagram_service.UMLBotConfig, "LLM_API_KEY", "key")
+    monkeypatch.setattr(diagram_service.UMLBotConfig, "LLM_API_BASE", "http://llm")
+    monkeypatch.setattr(diagram_service, "_fetch_plantuml_image", fake_fetch)
+    monkeypatch.setattr(diagram_service, "_LLM_CODE_CACHE", diagram_service.TTLCache())
+    diagram_service.reset_handler()
+
+    def install(handler_class):
+        monkeypatch.setattr(diagram_service, "UMLDraftHandler", handler_class)
+
+    yield install
+    diagram_service.reset_handler()
+
+
+async def _collect_stream(description):
+    return [
+        item
+        async for item in diagram_service.stream_diagram_from_description(description, "class")
+    ]
+
+
+def test_plantuml_encode_round_trips():
+    code = "@startuml\nclass Foo {\n  +bar(): int\n}\nFoo --> Baz : uses\n@enduml"
+    encoded = _plantuml_encode(code)
+    assert set(encoded) <= set(_PLANTUML_ALPHABET + "=")
+    assert _plantuml_decode(encoded) == code
+
+
+def test_diagram_image_to_base64_passes_png_bytes_through():
+    png = b"\x89PNG\r\n\x1a\nfake"
+    assert diagram_image_to_base64(png) == base64.b64encode(png).decode("ascii")
+    assert diagram_image_to_base64(None) is None
+
+
+def test_post_processing_collapses_fences_and_doubled_braces():
+    raw = "```plantuml\n@startuml\nnode A {{\n}}\n@enduml\n```"
+    cleaned = _clean_plantuml_code(raw)
+    assert cleaned == "@startuml\nnode A {\n}\n@enduml"
+    assert _normalize_curly_braces("a {{{ b }}} {x}") == "a { b } {x}"
+
+
+def test_post_processing_leaves_clean_code_untouched():
+    code = "@startuml\nnode A {\n}\n@enduml"
+    assert _strip_code_block_markers(f"  {code}\n") == code
+    assert _normalize_curly_braces(code) is code
+
+
+def test_generation_result_decodes_png_bytes_on_demand():
+    buf = io.BytesIO()
+    Image.new("RGB", (4, 3), color="white").save(buf, format="PNG")
+    result = DiagramGenerationResult(
+        plantuml_code="@startuml\n@enduml",
+        pil_image=None,
+        status_message="ok",
+        image_url="http://example.com/png/abc",
+        png_bytes=buf.getvalue(),
+    )
+    image = result.load_image()
+    assert image.size == (4, 3)
+    assert result.load_image() is image
+
+
+async def test_generation_reuses_cached_llm_output(use_fake_handler):
+    calls = []
+
+    class FakeHandler(_FakeHandler):
+        def process(self, diagram_type, description, theme, llm_interface):
+            calls.append(description)
+            return "```plantuml\n@startuml\nclass Cached\n@enduml\n```"
+
+    use_fake_handler(FakeHandler)
+
+    first = await diagram_service.generate_diagram_from_description("Cache me", "class")
+    second = await diagram_service.generate_diagram_from_description("Cache me ", "class")
+    assert calls == ["Cache me"]
+    assert first.plantuml_code == second.plantuml_code == "@startuml\nclass Cached\n@enduml"
+    assert second.png_bytes == b"png" and not second.is_fallback
+    assert isinstance(diagram_service._HANDLER, FakeHandler)
+
+
+async def test_render_reuses_cached_png_bytes(monkeypatch):
+    requested = []
+
+    class FakeResponse:
+        headers = {"Content-Type": "image/png"}
+        content = b"png-bytes"
+
+        def raise_for_status(self):
+            pass
+
+    class FakeClient:
+        async def get(self, url):
+            requested.append(url)
+            return FakeResponse()
+
+    monkeypatch.setattr(diagram_service, "get_http_client", FakeClient)
+    monkeypatch.setattr(diagram_service, "_PNG_CACHE", diagram_service.TTLCache())
+
+    code = "@startuml\nclass Rendered\n@enduml"
+    first = await diagram_service.render_png_from_code(code)
+    second = await diagram_service.render_png_from_code(code)
+    assert first == second
+    assert first[0] == b"png-bytes"
+    assert len(requested) == 1
+
+
+def test_plantuml_url_template_forms():
+    assert _split_plantuml_url_template("http://host/png/{encoded}") == ("http://host/png/", "")
+    assert _split_plantuml_url_template("http://host/png/") == ("http://host/png/", "")
+    assert _split_plantuml_url_template("http://h/{encoded}.png") == ("http://h/", ".png")
+
+
+def test_placeholder_images_are_independent_copies():
+    first = diagram_service.create_placeholder_image(size=(60, 30))
+    first.putpixel((0, 0), (0, 0, 0))
+    second = diagram_service.create_placeholder_image(size=(60, 30))
+    assert second.size == (60, 30)
+    assert second.getpixel((0, 0)) == (255, 255, 255)
+
+
+async def test_stream_stops_at_enduml_split_across_chunks(use_fake_handler):
+    consumed = []
+
+    class FakeHandler(_FakeHandler):
+        async def process_stream_async(self, **kwargs):
+            for chunk in ["@startuml\nclass A\n@end", "uml\n```\nNote: ", "more text"]:
+                consumed.append(chunk)
+                yield chunk
+
+    use_fake_handler(FakeHandler)
+
+    items = await _collect_stream("Stream")
+    assert items[:2] == ["@startuml\nclass A\n@end", "uml"]
+    assert items[-1].plantuml_code == "@startuml\nclass A\n@enduml"
+    assert consumed == ["@startuml\nclass A\n@end", "uml\n```\nNote: "]
+
+
+def test_llm_calls_are_bound_with_configured_limits(monkeypatch):
+    class FakeLLM:
+        def bind(self, **kwargs):
+            return ("bound", kwargs)
+
+    monkeypatch.setattr(diagram_service.UMLBotConfig, "LLM_MAX_TOKENS", 100)
+    monkeypatch.setattr(diagram_service.UMLBotConfig, "LLM_TIMEOUT_SECONDS", 5.0)
+    assert diagram_service._bound_llm(FakeLLM()) == (
+        "bound",
+        {"max_tokens": 100, "timeout": 5.0},
+    )
+    assert diagram_service._bound_llm(None) is None
+
+
+def test_plantuml_encode_memoizes_repeat_sources():
+    code = "@startuml\nclass Memo\n@enduml"
+    _plantuml_encode.cache_clear()
+    first = _plantuml_encode(code)
+    assert _plantuml_encode(code) is first
+    assert _plantuml_encode.cache_info().hits == 1
+
+
+def test_shared_handler_is_built_once(use_fake_handler):
+    built = []
+
+    class FakeHandler(_FakeHandler):
+        def __init__(self):
+            built.append(self)
+
+    use_fake_handler(FakeHandler)
+
+    assert diagram_service.get_shared_handler() is diagram_service.get_shared_handler()
+    assert len(built) == 1
+
+
+async def test_stream_releases_llm_slot_before_client_reads(use_fake_handler, monkeypatch):
+    class FakeHandler(_FakeHandler):
+        async def process_stream_async(self, **kwargs):
+            for chunk in ["@startuml\n", "class Slow\n", "@enduml"]:
+                yield chunk
+
+    use_fake_handler(FakeHandler)
+    monkeypatch.setattr(diagram_service, "_LLM_SEM", asyncio.Semaphore(1))
+
+    stream = diagram_service.stream_diagram_from_description("Slow reader", "class")
+    assert await anext(stream) == "@startuml\n"
+    # The client has read one chunk, but the LLM output is fully buffered already.
+    for _ in range(5):
+        await asyncio.sleep(0)
+    released = not diagram_service._LLM_SEM.locked()
+    await stream.aclose()
+    assert released
+
+
+async def test_stream_drops_prose_before_startuml(use_fake_handler):
+    class FakeHandler(_FakeHandler):
+        async def process_stream_async(self, **kwargs):
+            chunks = ["Here is the diagram:\n```plantuml\n", "@startuml\nclass P\n", "@enduml\n```"]
+            for chunk in chunks:
+                yield chunk
+
+    use_fake_handler(FakeHandler)
+
+    result = (await _collect_stream("Prose"))[-1]
+    assert result.plantuml_code == "@startuml\nclass P\n@enduml"
@@ -6,6 +6,9 @@ Covers error detection, correction callback, and retry limit enforcement.
 import pytest
 from llm_utils.aiweb_common.generate.GenericErrorHandler import GenericErrorHandler
 
+# Exceptions compare by identity, so tests return (and assert on) this one instance.
+_FAIL = Exception("fail")
+
 
 def test_successful_operation():
     # Operation always succeeds
@@ -20,7 +23,7 @@ def test_successful_operation():
 
 def test_error_detection_and_correction(monkeypatch):
     # Operation fails first, then succeeds
-    results = [Exception("fail"), "success"]
+    results = [_FAIL, "success"]
 
     def operation():
         return results.pop(0)
@@ -40,13 +43,13 @@ def test_error_detection_and_correction(monkeypatch):
         max_retries=2,
     )
     assert handler.run() == "success"
-    assert correction_calls == [(1, Exception("fail"))]
+    assert correction_calls == [(1, _FAIL)]
 
 
 def test_retry_limit_enforced():
     # Operation always fails
     def operation():
-        return Exception("fail")
+        return _FAIL
 
     def error_predicate(result):
         return isinstance(result, Exception)
@@ -4,18 +4,19 @@ Mocks UI/user input and verifies end-to-end error handling and revision workflow
 """
 
 import pytest
-from unittest.mock import Mock
-from UMLBot.uml_draft_handler import UMLDraftHandler
-from UMLBot.config.config import UMLBotConfig
 from llm_utils.aiweb_common.generate.GenericErrorHandler import GenericErrorHandler
+from UMLBot.uml_draft_handler import UMLRetryManager
 
+_LLM_ERROR = Exception("LLM error")
+_ALWAYS_FAILS = Exception("Always fails")
 
-class DummyPrompt:
-    def __init__(self, template):
-        self.template = template
 
-    def format_prompt(self, **kwargs):
-        return f"Diagram: {kwargs.get('diagram_type')}, Desc: {kwargs.get('description')}, Theme: {kwargs.get('theme', '')}"
+class _AlwaysFailLLM:
+    def invoke(self, prompt):
+        raise _ALWAYS_FAILS
+
+
+_ALWAYS_FAIL_LLM = _AlwaysFailLLM()
 
 
 def test_chat_history_scrollable_and_persistent(monkeypatch):
@@ -23,6 +24,8 @@ def test_chat_history_scrollable_and_persistent(monkeypatch):
     Verifies that the chat history is preserved and all messages (user, assistant, system, error)
     are present and accessible for scrolling in the Gradio UI.
     """
+    # Importing gradio_app builds the whole UI; skip in environments without gradio.
+    pytest.importorskip("gradio")
     from gradio_app import format_chat_history
 
     # Simulate a session with multiple message types
@@ -45,14 +48,11 @@ def test_chat_history_scrollable_and_persistent(monkeypatch):
     # Here, we check the formatting and presence only
 
 
-def test_chat_uml_revision_with_error_handler(monkeypatch):
+def test_chat_uml_revision_with_error_handler(uml_handler):
     # Simulate a chat workflow where the first UML generation fails, then succeeds after correction
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
-    monkeypatch.setattr(handler, "check_content_type", lambda x: x)
 
     # Simulate LLM interface: first call returns error, second call returns valid UML
-    llm_calls = [Exception("LLM error"), "@startuml\nclass Foo\n@enduml"]
+    llm_calls = [_LLM_ERROR, "@startuml\nclass Foo\n@enduml"]
 
     class MockLLM:
         def invoke(self, prompt):
@@ -63,9 +63,7 @@ def test_chat_uml_revision_with_error_handler(monkeypatch):
 
     def operation():
         try:
-            from UMLBot.uml_draft_handler import UMLRetryManager
-
-            return handler.process(
+            return uml_handler.process(
                 "class",
                 "Foo system",
                 "bluegray",
@@ -94,29 +92,23 @@ def test_chat_uml_revision_with_error_handler(monkeypatch):
     if isinstance(result, Exception):
         assert False, f"Expected UML string, got Exception: {result}"
     assert "@startuml" in str(result)
-    assert corrections == [(1, "LLM error")]
+    # process() does not retry a plain Exception, so the handler sees its wrapped RuntimeError.
+    assert [attempt for attempt, _ in corrections] == [1]
+    assert "LLM error" in corrections[0][1]
 
 
-def test_integration_respects_retry_limit(monkeypatch):
+@pytest.mark.parametrize("max_retries", [1, 2, 3])
+def test_integration_respects_retry_limit(uml_handler, max_retries):
     # Simulate repeated failures and ensure retry limit is respected
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
-    monkeypatch.setattr(handler, "check_content_type", lambda x: x)
-
-    class MockLLM:
-        def invoke(self, prompt):
-            raise Exception("Always fails")
 
     def operation():
         try:
-            from UMLBot.uml_draft_handler import UMLRetryManager
-
-            return handler.process(
+            return uml_handler.process(
                 "class",
                 "Foo system",
                 "bluegray",
-                llm_interface=MockLLM(),
-                retry_manager=UMLRetryManager(max_retries=3),
+                llm_interface=_ALWAYS_FAIL_LLM,
+                retry_manager=UMLRetryManager(max_retries=max_retries),
             )
         except Exception as e:
             return e
@@ -133,8 +125,8 @@ def test_integration_respects_retry_limit(monkeypatch):
         operation=operation,
         error_predicate=error_predicate,
         correction_callback=correction_callback,
-        max_retries=3,
+        max_retries=max_retries,
     )
     with pytest.raises(RuntimeError):
         error_handler.run()
-    assert corrections == [1, 2, 3]
+    assert corrections == list(range(1, max_retries + 1))
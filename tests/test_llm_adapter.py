@@ -16,7 +16,6 @@ def test_adapter_raises_on_exception():
     with pytest.raises(LLMError):
         adapter.invoke("test prompt")
 
-@pytest.mark.asyncio
 async def test_adapter_invoke_async():
     def mock_llm(prompt: str) -> str:
         return f"async response for: {prompt}"
@@ -24,6 +23,41 @@ async def test_adapter_invoke_async():
     result = await adapter.invoke_async("async prompt")
     assert result == "async response for: async prompt"
 
+async def test_adapter_awaits_coroutine_callables_directly(monkeypatch):
+    async def mock_llm(prompt: str) -> str:
+        return f"native async: {prompt}"
+
+    async def fail_to_thread(*args, **kwargs):
+        raise AssertionError("coroutine callables must not be sent to a thread")
+
+    monkeypatch.setattr("UMLBot.llm_interface.asyncio.to_thread", fail_to_thread)
+    adapter = LangchainLLMAdapter({"llm_callable": mock_llm})
+    assert await adapter.invoke_async("prompt") == "native async: prompt"
+
+def test_adapter_invoke_rejects_async_only_callables():
+    async def mock_llm(prompt: str) -> str:
+        return "never awaited"
+
+    adapter = LangchainLLMAdapter({"llm_callable": mock_llm})
+    with pytest.raises(TypeError, match="invoke_async"):
+        adapter.invoke("prompt")
+
 def test_adapter_invalid_config():
     with pytest.raises(ValueError):
         LangchainLLMAdapter({"llm_callable": None})
+
+async def test_adapter_astream_uses_callable_astream_when_available():
+    class StreamingLLM:
+        def __call__(self, prompt: str) -> str:
+            return "unused"
+
+        async def astream(self, prompt: str):
+            for piece in ("@startuml\n", "class A\n", "@enduml"):
+                yield piece
+
+    adapter = LangchainLLMAdapter({"llm_callable": StreamingLLM()})
+    chunks = [chunk async for chunk in adapter.astream("prompt")]
+    assert chunks == ["@startuml\n", "class A\n", "@enduml"]
+
+    plain = LangchainLLMAdapter({"llm_callable": lambda prompt: f"whole {prompt}"})
+    assert [chunk async for chunk in plain.astream("prompt")] == ["whole prompt"]
@@ -0,0 +1,23 @@
+"""
+Unit tests for extracting the last PlantUML block from chat responses.
+"""
+
+import pytest
+
+from UMLBot.utils.plantuml_extractor import extract_last_plantuml_block
+
+
+def test_extract_returns_last_block():
+    text = (
+        "First try:\n```plantuml\n@startuml\nclass A\n@enduml\n```\n"
+        "Revised:\n```plantuml\n@startuml\nclass B\n@enduml\n```\nDone."
+    )
+    assert extract_last_plantuml_block(text) == "@startuml\nclass B\n@enduml"
+
+
+def test_extract_handles_unfenced_block_and_rejects_missing_markers():
+    assert extract_last_plantuml_block("Here: @startuml\nA -> B\n@enduml thanks") == (
+        "@startuml\nA -> B\n@enduml"
+    )
+    with pytest.raises(ValueError):
+        extract_last_plantuml_block("```plantuml\nclass A\n```")
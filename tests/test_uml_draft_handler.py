@@ -3,48 +3,40 @@ Unit tests for UMLDraftHandler (chat-based UML revision workflow).
 Covers prompt construction, LLM invocation, and error handling.
 """
 
+import os
+from unittest.mock import Mock
+
 import pytest
-from unittest.mock import Mock, patch
-from UMLBot.uml_draft_handler import UMLDraftHandler
-from UMLBot.config.config import UMLBotConfig
+from UMLBot.exceptions import LLMError
+from UMLBot.llm_interface import LangchainLLMAdapter
+from UMLBot.uml_draft_handler import UMLDraftHandler, UMLRetryManager
 
 
-class DummyPrompt:
-    def __init__(self, template):
-        self.template = template
+class _StubLLM:
+    def __init__(self, response):
+        self.response = response
 
-    def format_prompt(self, **kwargs):
-        # Simulate prompt formatting
-        return f"Diagram: {kwargs.get('diagram_type')}, Desc: {kwargs.get('description')}, Theme: {kwargs.get('theme', '')}"
+    def invoke(self, prompt):
+        return self.response
 
 
-def test_construct_prompt_appends_context(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
-    prompt = handler.construct_prompt("class", "A system", "bluegray")
+def test_construct_prompt_appends_context(uml_handler):
+    prompt = uml_handler.construct_prompt("class", "A system", "bluegray")
     assert "Diagram: class" in prompt
     assert "Desc: A system" in prompt
     assert "Theme: bluegray" in prompt
 
 
-def test_process_invokes_llm_and_returns_diagram(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
-    mock_llm = Mock()
-    mock_llm.invoke.return_value = "@startuml\nclass Foo\n@enduml"
-    monkeypatch.setattr(handler, "check_content_type", lambda x: x)
-    result = handler.process("class", "Foo system", "bluegray", llm_interface=mock_llm)
+def test_process_invokes_llm_and_returns_diagram(uml_handler):
+    llm = _StubLLM("@startuml\nclass Foo\n@enduml")
+    result = uml_handler.process("class", "Foo system", "bluegray", llm_interface=llm)
     assert "@startuml" in result
     assert "class Foo" in result
 
 
-def test_process_raises_on_missing_llm(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
-    from UMLBot.uml_draft_handler import UMLRetryManager
-
+def test_process_raises_on_missing_llm(uml_handler):
     with pytest.raises(RuntimeError):
-        handler.process(
+        uml_handler.process(
             "class",
             "Foo system",
             "bluegray",
@@ -53,51 +45,164 @@ def test_process_raises_on_missing_llm(monkeypatch):
         )
 
 
-def test_process_retries_and_surfaces_error(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
+@pytest.mark.parametrize("max_retries", [1, 2, 3])
+def test_process_retries_and_surfaces_error(uml_handler, max_retries):
+    calls = []
 
     class AlwaysFailLLM:
         def invoke(self, prompt):
-            raise Exception("LLM always fails")
-
-    from UMLBot.uml_draft_handler import UMLRetryManager
-
-    retry_manager = UMLRetryManager(max_retries=3)
-    with pytest.raises(RuntimeError) as excinfo:
-        handler.process(
+            calls.append(prompt)
+            raise LLMError("LLM always fails")
+
+    retry_manager = UMLRetryManager(max_retries=max_retries, backoff_base=0.0)
+    with pytest.raises(
+        RuntimeError,
+        match=rf"(?s)UML diagram generation failed after {max_retries} attempts.*LLM always fails",
+    ):
+        uml_handler.process(
             "class",
             "Foo system",
             "bluegray",
             llm_interface=AlwaysFailLLM(),
             retry_manager=retry_manager,
         )
-    assert "UML diagram generation failed after 3 attempts" in str(excinfo.value)
-    assert "LLM always fails" in str(excinfo.value)
+    assert len(calls) == max_retries
+
+
+def test_process_does_not_retry_non_transient_errors(uml_handler):
+    calls = []
+
+    class BadOutputLLM:
+        def invoke(self, prompt):
+            calls.append(prompt)
+            raise ValueError("unexpected response type")
+
+    with pytest.raises(RuntimeError, match="failed after 1 attempts"):
+        uml_handler.process(
+            "class",
+            "Foo system",
+            "bluegray",
+            llm_interface=BadOutputLLM(),
+            retry_manager=UMLRetryManager(max_retries=3),
+        )
+    assert len(calls) == 1
 
 
-def test_validate_prompt_template_missing_required(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
+def test_validate_prompt_template_missing_required(uml_config):
+    handler = UMLDraftHandler(config=uml_config)
     # Missing 'diagram_type' and 'description'
     bad_template = "Generate a {theme} diagram"
     with pytest.raises(ValueError):
         handler._validate_prompt_template(bad_template)
 
 
-def test_validate_prompt_template_malformed(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
+def test_validate_prompt_template_malformed(uml_config):
+    handler = UMLDraftHandler(config=uml_config)
     # Malformed Python placeholder
     bad_template = "Generate a {123bad} diagram for: {description}"
     with pytest.raises(ValueError):
         handler._validate_prompt_template(bad_template)
 
 
-def test_construct_prompt_escapes_curly_braces(monkeypatch):
-    handler = UMLDraftHandler(config=UMLBotConfig())
-    monkeypatch.setattr(handler, "load_prompty", lambda: DummyPrompt("template"))
+@pytest.mark.parametrize(
+    "bad_template",
+    ["{diagram_type}}{{description}", "{description}}{{diagram_type}"],
+)
+def test_validate_prompt_template_rejects_stray_braces_around_jinja(uml_config, bad_template):
+    handler = UMLDraftHandler(config=uml_config)
+    with pytest.raises(ValueError, match="Malformed"):
+        handler._validate_prompt_template(bad_template)
+
+
+def test_construct_prompt_escapes_curly_braces(uml_handler):
     plantuml_block = "@startuml\nskinparam {\n  BackgroundColor #EEEBDC\n}\n@enduml"
-    prompt = handler.construct_prompt("class", plantuml_block, "bluegray")
+    prompt = uml_handler.construct_prompt("class", plantuml_block, "bluegray")
     # The curly braces in the PlantUML block should be escaped
     assert "{{" in prompt and "}}" in prompt
     # The PlantUML block should still be present in the output
     assert "skinparam" in prompt
+
+
+def test_retry_manager_backs_off_only_on_transient_errors():
+    class RateLimited(Exception):
+        status_code = 429
+
+    retry_manager = UMLRetryManager(max_retries=3, backoff_base=1.0, backoff_cap=30.0)
+    retry_manager.record_error(Exception("bad output"))
+    assert retry_manager.backoff_seconds() == 0.0
+    retry_manager.record_error(RateLimited("slow down"))
+    assert 1.0 <= retry_manager.backoff_seconds() <= 2.0
+    retry_manager.record_error(TimeoutError("read timed out"))
+    assert 2.0 <= retry_manager.backoff_seconds() <= 4.0
+
+
+def test_process_does_not_retry_template_errors(monkeypatch, uml_config):
+    handler = UMLDraftHandler(config=uml_config)
+
+    def missing_prompty():
+        raise FileNotFoundError("uml_diagram.prompty")
+
+    monkeypatch.setattr(handler, "load_prompty", missing_prompty)
+    mock_llm = Mock()
+    with pytest.raises(RuntimeError, match="failed after 1 attempts"):
+        handler.process("class", "Foo system", "bluegray", llm_interface=mock_llm)
+    mock_llm.invoke.assert_not_called()
+
+
+def test_construct_prompt_reloads_template_only_when_file_changes(
+    monkeypatch, tmp_path, uml_config, dummy_prompt_class
+):
+    handler = UMLDraftHandler(config=uml_config)
+    handler.prompty_path = tmp_path / "uml_diagram.prompty"
+    handler.prompty_path.write_text("v1")
+    loads = []
+
+    def fake_load():
+        loads.append(handler.prompty_path.read_text())
+        return dummy_prompt_class(loads[-1])
+
+    monkeypatch.setattr(handler, "load_prompty", fake_load)
+    handler.construct_prompt("class", "A system")
+    handler.construct_prompt("class", "A system")
+    assert loads == ["v1"]
+
+    handler.prompty_path.write_text("v2")
+    stat = handler.prompty_path.stat()
+    os.utime(handler.prompty_path, (stat.st_atime, stat.st_mtime + 5))
+    handler.construct_prompt("class", "A system")
+    assert loads == ["v1", "v2"]
+
+
+def test_process_does_not_retry_without_llm_interface(
+    monkeypatch, uml_config, dummy_prompt_class
+):
+    handler = UMLDraftHandler(config=uml_config)
+    prompts = []
+
+    def load():
+        prompts.append(1)
+        return dummy_prompt_class("template")
+
+    monkeypatch.setattr(handler, "load_prompty", load)
+    with pytest.raises(RuntimeError, match="failed after 1 attempts"):
+        handler.process("class", "Foo system", "bluegray", llm_interface=None)
+    assert prompts == []
+
+
+async def test_process_stream_async_streams_through_adapter(uml_handler):
+    class StreamingLLM:
+        def __call__(self, prompt):
+            raise AssertionError("streaming must not fall back to a blocking call")
+
+        async def astream(self, prompt):
+            for piece in ("@startuml\n", "class A\n", "@enduml"):
+                yield piece
+
+    adapter = LangchainLLMAdapter({"llm_callable": StreamingLLM()})
+    chunks = [
+        chunk
+        async for chunk in uml_handler.process_stream_async(
+            "class", "A system", "bluegray", llm_interface=adapter
+        )
+    ]
+    assert chunks == ["@startuml\n", "class A\n", "@enduml"]